@@ -0,0 +1,114 @@
+"""
+Measure the effect engine: the time to render a frame with NumPy against the frame budget and against a per-pixel Python loop,
+and the frame rate and timing jitter achieved when streaming an effect to the fake UDP realtime receiver.
+Run with: python benchmarks/bench_effects.py [fps] [stream_seconds]
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long,wrong-import-position
+import math
+import os
+import statistics
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import effects
+from fake_wled import FakeRealtimeReceiver
+from realtime import UDPTransport
+
+LED_COUNTS = (60, 300, 1000, 5000)
+COLOR = (255, 0, 0)
+
+def python_breathe_cycle(color: tuple, led_count: int, frames: int) -> list:
+    """
+    Reference per-pixel implementation of the breathe effect, as it would be written without NumPy.
+    :param color: The (r, g, b) color.
+    :type color: tuple
+    :param led_count: The number of LEDs.
+    :type led_count: int
+    :param frames: The number of frames of the cycle.
+    :type frames: int
+    :return: list: The RGB bytes of each frame.
+    """
+    cycle = []
+    for frame in range(frames):
+        level = effects.FLOOR + (1 - effects.FLOOR) * (0.5 - 0.5 * math.cos(2 * math.pi * frame / frames)) ** 2
+        pixels = bytearray()
+        for _ in range(led_count):
+            for channel in color:
+                pixels.append(round(level * channel))
+        cycle.append(bytes(pixels))
+    return cycle
+
+def bench_render(fps: int) -> list:
+    """
+    Render a cold frame cycle of every effect for several LED counts.
+    :param fps: The frame rate, giving the frame budget.
+    :type fps: int
+    :return: list: The render time per frame of each effect and LED count.
+    """
+    results = []
+    frames = round(fps * effects.DEFAULT_PERIOD)
+    effects.frame_cycle("pulse", COLOR, 10, fps)
+    for led_count in LED_COUNTS:
+        for effect in effects.EFFECTS[1:]:
+            effects.frame_cycle.cache_clear()
+            start = time.perf_counter()
+            cycle = effects.frame_cycle(effect, COLOR, led_count, fps)
+            elapsed = time.perf_counter() - start
+            results.append({"effect": effect, "leds": led_count, "frames": len(cycle), "ms_per_frame": round(elapsed / len(cycle) * 1000, 4), "budget_ms": round(1000 / fps, 2)})
+        start = time.perf_counter()
+        reference = python_breathe_cycle(COLOR, led_count, frames)
+        elapsed = time.perf_counter() - start
+        assert reference[frames // 3] == effects.frame_cycle("breathe", COLOR, led_count, fps)[frames // 3].tobytes()
+        results.append({"effect": "breathe (python loop)", "leds": led_count, "frames": frames, "ms_per_frame": round(elapsed / frames * 1000, 4), "budget_ms": round(1000 / fps, 2)})
+    return results
+
+def bench_stream(fps: int, seconds: float, led_count: int = 300, protocol: str = "ddp") -> dict:
+    """
+    Stream the pulse effect to the fake receiver and measure the achieved frame rate and send interval jitter.
+    :param fps: The frame rate.
+    :type fps: int
+    :param seconds: How long to stream.
+    :type seconds: float
+    :param led_count: The number of LEDs.
+    :type led_count: int
+    :param protocol: The realtime protocol.
+    :type protocol: str
+    :return: dict: The frames sent and received, the achieved frame rate and interval statistics.
+    """
+    receiver = FakeRealtimeReceiver(led_count).start()
+    transport = UDPTransport("127.0.0.1", protocol, led_count, receiver.port)
+    sent_at = []
+    def send(pixels: bytes) -> bool:
+        sent_at.append(time.perf_counter())
+        return transport.send_frame(pixels)
+    streamer = effects.EffectStreamer(send, fps)
+    streamer.play(effects.frame_cycle("pulse", COLOR, led_count, fps))
+    time.sleep(seconds)
+    streamer.stop()
+    time.sleep(0.05)
+    transport.close()
+    receiver.stop()
+    intervals = sorted((b - a) * 1000 for a, b in zip(sent_at, sent_at[1:]))
+    return {"stream": protocol, "leds": led_count, "fps": fps, "sent": streamer.sent, "received": receiver.frames, "invalid": receiver.invalid, "skipped": streamer.skipped,
+            "achieved_fps": round(len(sent_at) / (sent_at[-1] - sent_at[0]) if len(sent_at) > 1 else 0, 2),
+            "interval_p50_ms": round(statistics.median(intervals), 3), "interval_p95_ms": round(intervals[int(len(intervals) * 0.95)], 3)}
+
+def main():
+    """
+    Run the render and streaming benchmarks and print the results.
+    :param None
+    :return: None
+    """
+    fps = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    if not effects.numpy_available():
+        print("NumPy is required for the effect benchmarks.")
+        return
+    for result in bench_render(fps):
+        print(result)
+    for protocol in ("drgb", "ddp"):
+        print(bench_stream(fps, seconds, protocol=protocol))
+
+if __name__ == "__main__":
+    main()
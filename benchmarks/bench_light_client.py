@@ -0,0 +1,96 @@
+"""
+Compare the per-tick cost of the pooled LightClient against the previous request pattern
+(module-level requests.get for the health check, a second GET for the state, then a POST).
+Run with: python benchmarks/bench_light_client.py [ticks] [latency_seconds]
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long,wrong-import-position
+import json
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import requests
+import config_handler
+from fake_wled import FakeWLED
+from light_handler import LightClient
+
+PAYLOADS = [{"on": True, "seg": [{"id": 0, "col": [[255, 0, 0]]}], "bri": 254},
+            {"on": True, "seg": [{"id": 0, "col": [[0, 255, 0]]}], "bri": 254}]
+SCENARIOS = {"steady": [None], "changing": PAYLOADS}
+
+def legacy_tick(url: str, payload: dict):
+    """
+    One tick as done before the LightClient: two GETs and a POST if the status changed, each on a new connection.
+    :param url: The JSON state URL of the light.
+    :type url: str
+    :param payload: The state to send, or None if the status did not change.
+    :type payload: dict or None
+    :return: None
+    """
+    requests.get(url, timeout=5).raise_for_status()
+    requests.get(url, timeout=5).json()
+    if payload is not None:
+        requests.post(url, json=payload, timeout=5).raise_for_status()
+
+def client_tick(client: LightClient, payload: dict):
+    """
+    One tick with the LightClient: a single GET and a POST if the status changed, on a kept-alive connection.
+    :param client: The light client.
+    :type client: LightClient
+    :param payload: The state to send, or None if the status did not change.
+    :type payload: dict or None
+    :return: None
+    """
+    client.fetch_state()
+    if payload is not None:
+        client.post_state(json.dumps(payload).encode("utf-8"))
+
+def run(name: str, scenario: str, tick, ticks: int, latency: float) -> dict:
+    """
+    Time a number of ticks against a fresh fake light.
+    :param name: The name of the measured variant.
+    :type name: str
+    :param scenario: The name of the payload scenario ("steady" or "changing").
+    :type scenario: str
+    :param tick: Function running one tick, given the light URL and payload.
+    :type tick: callable
+    :param ticks: The number of ticks to run.
+    :type ticks: int
+    :param latency: The latency of the fake light in seconds.
+    :type latency: float
+    :return: dict: The timing, request and connection counts.
+    """
+    server = FakeWLED(latency).start()
+    try:
+        start = time.perf_counter()
+        payloads = SCENARIOS[scenario]
+        for i in range(ticks):
+            tick(server.url, payloads[i % len(payloads)])
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+    return {"variant": name, "scenario": scenario, "ticks": ticks, "mean_tick_ms": round(elapsed / ticks * 1000, 3),
+            "requests": sum(server.requests.values()), "connections": server.connections}
+
+def main():
+    """
+    Run both variants and print the comparison.
+    :param None
+    :return: None
+    """
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.002
+    clients = {}
+    colors = config_handler.build_color_table({"busy": "(255, 0, 0)", "away": "(255, 255, 0)", "available": "(0, 255, 0)"})
+    def pooled(url, payload):
+        client = clients.get(url)
+        if client is None:
+            client = clients[url] = LightClient(config_handler.LightConfig("Light", url, colors))
+        client_tick(client, payload)
+    for scenario in SCENARIOS:
+        print(run("legacy", scenario, legacy_tick, ticks, latency))
+        print(run("pooled", scenario, pooled, ticks, latency))
+
+if __name__ == "__main__":
+    main()
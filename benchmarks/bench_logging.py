@@ -0,0 +1,122 @@
+"""
+Measure the status update tick with the previous logging setup (root logger at DEBUG writing synchronously to debug.log,
+urllib3 included) against the queue-based logging of log_setup, with and without the default per-logger levels.
+A per-record write delay can be added to every file write to stand in for a slow or contended disk.
+Run with: python benchmarks/bench_logging.py [ticks] [write_delay_seconds]
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long,wrong-import-position
+import logging
+import logging.handlers
+import os
+import statistics
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config_handler
+import light_handler
+import log_setup
+from fake_wled import FakeWLED
+
+def slow_disk(delay: float):
+    """
+    Make every log file write take at least the given time, as on a slow or contended disk.
+    :param delay: The added time per record in seconds.
+    :type delay: float
+    :return: None
+    """
+    emit = logging.FileHandler.emit
+    def slow_emit(handler, record):
+        time.sleep(delay)
+        emit(handler, record)
+    if delay:
+        logging.FileHandler.emit = slow_emit
+
+def reset_logging():
+    """
+    Remove every handler and per-logger level, stopping the queue listener if one is running.
+    :param None
+    :return: None
+    """
+    log_setup.stop_logging()
+    log_setup.LISTENER = None
+    log_setup.set_levels("WARNING", {})
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+def sync_file(path: str):
+    """
+    The logging setup before log_setup: every record is written to the file by the thread that logs it.
+    :param path: The log file.
+    :type path: str
+    :return: None
+    """
+    logging.basicConfig(filename=path, format=log_setup.LOG_FORMAT, filemode="w")
+    logging.getLogger().setLevel(logging.DEBUG)
+
+SETUPS = {
+    "off": lambda path: None,
+    "sync_file_debug": sync_file,
+    "queue_debug": lambda path: log_setup.start_logging(path, "DEBUG", levels={}),
+    "queue_default_levels": lambda path: log_setup.start_logging(path, "DEBUG"),
+}
+
+def run(name: str, path: str, ticks: int) -> dict:
+    """
+    Time status update ticks that query and update the fake light, with one logging setup.
+    :param name: The logging setup (see SETUPS).
+    :type name: str
+    :param path: The log file.
+    :type path: str
+    :param ticks: The number of ticks.
+    :type ticks: int
+    :return: dict: The tick time statistics and the number of log lines written.
+    """
+    SETUPS[name](path)
+    client = light_handler.get_clients()[0]
+    samples = []
+    for i in range(ticks):
+        client.shadow.invalidate()
+        start = time.perf_counter()
+        light_handler.sync_light(("Busy", "Away")[i % 2])
+        samples.append(time.perf_counter() - start)
+    reset_logging()
+    lines = 0
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            lines = sum(1 for _ in f)
+        os.remove(path)
+    samples.sort()
+    return {"logging": name, "ticks": ticks, "mean_ms": round(statistics.fmean(samples) * 1000, 3), "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+            "p95_ms": round(samples[int(len(samples) * 0.95)] * 1000, 3), "log_lines": lines}
+
+def main():
+    """
+    Run every logging setup against the fake light and print the comparison.
+    :param None
+    :return: None
+    """
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    write_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    slow_disk(write_delay)
+    server = FakeWLED().start()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            os.chdir(directory)
+            with open("config.ini", "w", encoding="utf-8") as f:
+                f.write(f"[Settings]\nlight_ip = 127.0.0.1:{server.server_address[1]}\nbusy = (255, 0, 0)\naway = (255, 255, 0)\navailable = (0, 255, 0)\nteams_log_path = {directory}/MSTeams*.log\nmanual_override = True\nhistory_file = \n")
+            config_handler.load_config()
+            reset_logging()
+            run("off", "warmup.log", 20)
+            for name in SETUPS:
+                print({**run(name, os.path.join(directory, f"{name}.log"), ticks), "write_delay_ms": write_delay * 1000})
+        finally:
+            os.chdir(cwd)
+            server.stop()
+
+if __name__ == "__main__":
+    main()
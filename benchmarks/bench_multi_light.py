@@ -0,0 +1,67 @@
+"""
+Measure the multi-light fan-out against several local fake WLED servers with injected latency,
+including one unreachable light, and compare it with updating the lights one after the other.
+Run with: python benchmarks/bench_multi_light.py [lights] [max_latency_seconds]
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long,wrong-import-position
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config_handler
+import light_handler
+from fake_wled import FakeWLED
+
+def write_config(directory: str, servers: list) -> str:
+    """
+    Write a configuration with one light per fake server plus one unreachable light.
+    :param directory: The directory to write config.ini and a Teams log into.
+    :type directory: str
+    :param servers: The fake lights.
+    :type servers: list
+    :return: str: The path of the Teams log file.
+    """
+    log_path = os.path.join(directory, "MSTeams_bench.log")
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write("bench status Busy\n")
+    sections = [f"[Settings]\nlight_ip = {servers[0].server_address[0]}:{servers[0].server_address[1]}\nbusy = (255, 0, 0)\naway = (255, 255, 0)\navailable = (0, 255, 0)\nteams_log_path = {log_path}\n"]
+    for index, server in enumerate(servers[1:], start=1):
+        sections.append(f"[Light Bench {index}]\nip = {server.server_address[0]}:{server.server_address[1]}\n")
+    sections.append("[Light Unreachable]\nip = 127.0.0.1:9\n")
+    with open(os.path.join(directory, "config.ini"), "w", encoding="utf-8") as f:
+        f.write("\n".join(sections))
+    return log_path
+
+def main():
+    """
+    Run the fan-out benchmark and print the result.
+    :param None
+    :return: None
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    max_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    servers = [FakeWLED(max_latency * (index + 1) / count).start() for index in range(count)]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            os.chdir(directory)
+            log_path = write_config(directory, servers)
+            config_handler.load_config()
+            results = {}
+            for status in ("Available", "Away", "Busy"):
+                with open(log_path, "a", encoding="utf-8") as f:
+                    f.write(f"bench status {status}\n")
+                start = time.perf_counter()
+                light_health, _ = light_handler.sync_light()
+                results[status] = round((time.perf_counter() - start) * 1000, 1)
+            print({"lights": count + 1, "tick_ms": results, "slowest_round_trip_ms": round(max_latency * 1000, 1),
+                   "sequential_round_trips_ms": round(sum(server.latency for server in servers) * 1000, 1), "health": light_health})
+        finally:
+            os.chdir(cwd)
+            for server in servers:
+                server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Measure office mode with many users, each with their own synthetic Teams log and fake light:
+the time from a Teams log write to the user's light receiving the new state, while statuses change for every user at once,
+and that every light ends up showing its own user's status.
+The fake lights run in a separate process, so that serving them does not compete with office mode for the interpreter.
+Run with: python benchmarks/bench_office.py [users] [rounds] [workers] [light_latency_seconds]
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long,wrong-import-position
+import datetime
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config_handler
+import office
+from fake_wled import FakeWLED
+from generate_teams_log import status_line
+
+STATUSES = ("Available", "Busy", "Away")
+COLORS = {"Available": [0, 255, 0], "Busy": [255, 0, 0], "Away": [255, 255, 0]}
+
+def serve_lights(connection, count: int, latency: float):
+    """
+    Run the fake lights in a child process, answering requests for their state over a pipe until told to stop.
+    :param connection: The child end of the pipe; the ports are sent first, then a snapshot for every request.
+    :type connection: multiprocessing.connection.Connection
+    :param count: The number of fake lights.
+    :type count: int
+    :param latency: The latency of the fake lights in seconds.
+    :type latency: float
+    :return: None
+    """
+    servers = [FakeWLED(latency).start() for _ in range(count)]
+    connection.send([server.server_address[1] for server in servers])
+    while connection.recv() == "snapshot":
+        connection.send([(server.state["seg"][0]["col"][0], server.posted_at) for server in servers])
+
+def write_config(directory: str, ports: list, workers: int):
+    """
+    Write a configuration with one [Light <name>] and one [User <name>] section per user.
+    :param directory: The directory holding a log directory per user.
+    :type directory: str
+    :param ports: The port of each user's fake light.
+    :type ports: list
+    :param workers: The office_workers setting.
+    :type workers: int
+    :return: None
+    """
+    with open("config.ini", "w", encoding="utf-8") as f:
+        f.write("[Settings]\nlight_ip = 127.0.0.1:9\nbusy = (255, 0, 0)\naway = (255, 255, 0)\navailable = (0, 255, 0)\n"
+                f"teams_log_path = {directory}/none.log\nhistory_file = \ntransition_dwell = 0\ntransition_hysteresis = 0\n"
+                f"office_workers = {workers}\noffice_poll_interval = 0.1\n")
+        for i, port in enumerate(ports):
+            f.write(f"\n[Light desk{i}]\nip = 127.0.0.1:{port}\n")
+            f.write(f"\n[User user{i}]\nteams_log_path = {directory}/user{i}/MSTeams*.log\nlights = desk{i}\n")
+
+def log_status(path: str, status: str) -> float:
+    """
+    Append a status line to a user's Teams log.
+    :param path: The user's Teams log.
+    :type path: str
+    :param status: The status to log.
+    :type status: str
+    :return: float: The time of the write.
+    """
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(status_line(datetime.datetime.now(), 1, status))
+    return time.time()
+
+def wait_for(lights, expected: list, timeout: float):
+    """
+    Wait until every fake light shows the expected color.
+    :param lights: The parent end of the pipe to the fake lights.
+    :type lights: multiprocessing.connection.Connection
+    :param expected: The expected status of each user.
+    :type expected: list
+    :param timeout: Seconds to wait at most.
+    :type timeout: float
+    :return: list or None: When each light was last posted to, or None if not every light showed its user's status in time.
+    """
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        lights.send("snapshot")
+        snapshot = lights.recv()
+        if all(color == COLORS[status] for (color, _), status in zip(snapshot, expected)):
+            return [posted_at for _, posted_at in snapshot]
+        time.sleep(0.005)
+    return None
+
+def main():
+    """
+    Run office mode against the fake lights and print the latency and isolation results.
+    :param None
+    :return: None
+    """
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    latency = float(sys.argv[4]) if len(sys.argv) > 4 else 0.002
+    lights, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=serve_lights, args=(child, users, latency), daemon=True)
+    process.start()
+    ports = lights.recv()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            os.chdir(directory)
+            logs = []
+            for i in range(users):
+                os.mkdir(os.path.join(directory, f"user{i}"))
+                logs.append(os.path.join(directory, f"user{i}", "MSTeams_1.log"))
+                log_status(logs[-1], STATUSES[i % len(STATUSES)])
+            write_config(directory, ports, workers)
+            config_handler.load_config()
+            service = office.create_service().start()
+            try:
+                assert wait_for(lights, [STATUSES[i % len(STATUSES)] for i in range(users)], 30), "initial sync did not complete"
+                latencies = []
+                start = time.perf_counter()
+                for round_number in range(1, rounds + 1):
+                    expected = [STATUSES[(i + round_number) % len(STATUSES)] for i in range(users)]
+                    written = [log_status(log, status) for log, status in zip(logs, expected)]
+                    posted = wait_for(lights, expected, 30)
+                    assert posted is not None, f"round {round_number}: lights did not follow their users"
+                    latencies.extend(posted_at - at for posted_at, at in zip(posted, written))
+                elapsed = time.perf_counter() - start
+                single = []
+                for i in range(0, users, max(1, users // 50)):
+                    expected[i] = STATUSES[(STATUSES.index(expected[i]) + 1) % len(STATUSES)]
+                    written = log_status(logs[i], expected[i])
+                    posted = wait_for(lights, expected, 30)
+                    assert posted is not None, f"user{i}: light did not follow"
+                    single.append(posted[i] - written)
+                threads = sum(1 for thread in threading.enumerate() if thread.name.startswith("Office"))
+            finally:
+                service.stop()
+            latencies.sort()
+            single.sort()
+            print({"users": users, "lights": users, "workers": workers, "light_latency_ms": latency * 1000, "office_threads": threads, "all_lights_match_their_user": True})
+            print({"scenario": "every user changes at once", "rounds": rounds, "updates": len(latencies), "updates_per_s": round(len(latencies) / elapsed),
+                   "p50_ms": round(statistics.median(latencies) * 1000, 2), "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2), "max_ms": round(latencies[-1] * 1000, 2)})
+            print({"scenario": "one user changes at a time", "updates": len(single), "p50_ms": round(statistics.median(single) * 1000, 2),
+                   "p95_ms": round(single[int(len(single) * 0.95)] * 1000, 2), "max_ms": round(single[-1] * 1000, 2)})
+        finally:
+            os.chdir(cwd)
+            lights.send("stop")
+            process.join(timeout=5)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Load test for the push server: connect hundreds of idle Server-Sent Events and WebSocket subscribers,
+publish status transitions and measure how long each transition takes to reach every subscriber,
+then measure the request rate of GET /status when clients revalidate with If-None-Match.
+Run with: python benchmarks/bench_push_server.py [subscribers] [transitions]
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long,wrong-import-position,import-outside-toplevel
+import asyncio
+import base64
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from push_server import PushServer, websocket_accept
+
+STATUSES = ("Busy", "Available", "Away", "Do not disturb")
+
+async def sse_subscriber(port: int, received: dict, connected: asyncio.Event):
+    """
+    Follow /events and record when each version arrives.
+    :param port: The push server port.
+    :type port: int
+    :param received: Arrival times by version, appended to by every subscriber.
+    :type received: dict
+    :param connected: Event set once the first message was received.
+    :type connected: asyncio.Event
+    :return: None
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    await reader.readuntil(b"\r\n\r\n")
+    try:
+        while True:
+            event = await reader.readuntil(b"\n\n")
+            if event.startswith(b":"):
+                continue
+            data = json.loads(event.split(b"data: ", 1)[1])
+            received.setdefault(data["version"], []).append(time.perf_counter())
+            connected.set()
+    except (asyncio.IncompleteReadError, asyncio.CancelledError):
+        writer.close()
+
+async def websocket_subscriber(port: int, received: dict, connected: asyncio.Event):
+    """
+    Follow /ws and record when each version arrives.
+    :param port: The push server port.
+    :type port: int
+    :param received: Arrival times by version, appended to by every subscriber.
+    :type received: dict
+    :param connected: Event set once the first message was received.
+    :type connected: asyncio.Event
+    :return: None
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    writer.write(f"GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode("ascii"))
+    head = await reader.readuntil(b"\r\n\r\n")
+    assert websocket_accept(key).encode("ascii") in head, head
+    try:
+        while True:
+            first, length = await reader.readexactly(2)
+            if length == 126:
+                length = int.from_bytes(await reader.readexactly(2), "big")
+            payload = await reader.readexactly(length)
+            if first & 0x0F == 0x1:
+                received.setdefault(json.loads(payload)["version"], []).append(time.perf_counter())
+                connected.set()
+    except (asyncio.IncompleteReadError, asyncio.CancelledError):
+        writer.close()
+
+async def status_requests(port: int, seconds: float) -> dict:
+    """
+    Revalidate GET /status over one keep-alive connection for a while.
+    :param port: The push server port.
+    :type port: int
+    :param seconds: How long to send requests.
+    :type seconds: float
+    :return: dict: The request count, request rate and share of 304 answers.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    etag = None
+    requests = not_modified = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        writer.write(b"GET /status HTTP/1.1\r\nHost: localhost\r\n" + (b"If-None-Match: " + etag + b"\r\n" if etag else b"") + b"\r\n")
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = int(head.split(b"Content-Length: ", 1)[1].split(b"\r\n", 1)[0])
+        await reader.readexactly(length)
+        etag = head.split(b"ETag: ", 1)[1].split(b"\r\n", 1)[0]
+        requests += 1
+        not_modified += head.startswith(b"HTTP/1.1 304")
+    writer.close()
+    return {"requests": requests, "requests_per_s": round(requests / seconds), "not_modified": round(not_modified / requests, 4)}
+
+async def run(server: PushServer, subscribers: int, transitions: int) -> list:
+    """
+    Connect the subscribers, publish the transitions and collect the results.
+    :param server: The running push server.
+    :type server: PushServer
+    :param subscribers: The number of SSE subscribers, and of WebSocket subscribers.
+    :type subscribers: int
+    :param transitions: The number of status transitions to publish.
+    :type transitions: int
+    :return: list: The connection, fan-out latency and GET /status results.
+    """
+    received = {}
+    connected = [asyncio.Event() for _ in range(subscribers * 2)]
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(sse_subscriber(server.port, received, connected[i])) for i in range(subscribers)]
+    tasks += [asyncio.ensure_future(websocket_subscriber(server.port, received, connected[subscribers + i])) for i in range(subscribers)]
+    await asyncio.wait_for(asyncio.gather(*(event.wait() for event in connected)), 30)
+    results = [{"subscribers": server.subscribers, "connect_s": round(time.perf_counter() - start, 3)}]
+    latencies = []
+    for i in range(transitions):
+        version = server.version + 1
+        published = time.perf_counter()
+        server.publish(STATUSES[i % len(STATUSES)], {"Light": "Connected"})
+        while len(received.get(version, ())) < subscribers * 2:
+            await asyncio.sleep(0.001)
+        arrivals = received[version]
+        latencies.append((max(arrivals) - published, statistics.median(arrivals) - published))
+        server.publish(STATUSES[i % len(STATUSES)], {"Light": "Connected"})
+        await asyncio.sleep(0.02)
+    assert server.version == transitions + 1, "duplicate publishes must not create new versions"
+    last = sorted(latency for latency, _ in latencies)
+    results.append({"transitions": transitions, "deliveries": transitions * subscribers * 2,
+                    "median_subscriber_ms": round(statistics.median(median for _, median in latencies) * 1000, 3),
+                    "last_subscriber_p50_ms": round(statistics.median(last) * 1000, 3),
+                    "last_subscriber_p95_ms": round(last[int(len(last) * 0.95)] * 1000, 3),
+                    "last_subscriber_max_ms": round(last[-1] * 1000, 3)})
+    results.append({"endpoint": "/status", **await status_requests(server.port, 2.0)})
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return results
+
+def main():
+    """
+    Run the load test and print the results.
+    :param None
+    :return: None
+    """
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 250
+    transitions = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, subscribers * 4 + 256)), hard))
+    except ImportError:
+        pass
+    server = PushServer("127.0.0.1", 0).start()
+    server.publish("Available", {"Light": "Connected"})
+    time.sleep(0.05)
+    server_threads = threading.active_count()
+    try:
+        for result in asyncio.run(run(server, subscribers, transitions)):
+            print(result)
+        print({"threads": server_threads})
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
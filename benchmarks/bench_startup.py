@@ -0,0 +1,49 @@
+"""
+Compare the import cost of the headless entry point with the GUI entry point using python -X importtime.
+Run with: python benchmarks/bench_startup.py [runs]
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import os
+import subprocess
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+ENTRY_POINTS = {"headless": "import headless", "gui": "import headless, tkinter, gui, pystray, PIL.Image"}
+GUI_PACKAGES = ("tkinter", "_tkinter", "pystray", "PIL")
+
+def measure(code: str) -> dict:
+    """
+    Import the modules of an entry point in a fresh interpreter and collect the import times.
+    :param code: The import statement to run.
+    :type code: str
+    :return: dict: The wall time, total import time, number of modules and GUI modules imported.
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=SRC, capture_output=True, text=True, check=False)
+    wall = time.perf_counter() - start
+    total = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        total += int(self_us)
+        modules.append(name)
+    return {"ok": result.returncode == 0, "wall_ms": round(wall * 1000, 1), "import_ms": round(total / 1000, 1),
+            "modules": len(modules), "gui_modules": sum(1 for name in modules if name.split(".")[0] in GUI_PACKAGES)}
+
+def main():
+    """
+    Measure each entry point several times and print the median run.
+    :param None
+    :return: None
+    """
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, code in ENTRY_POINTS.items():
+        results = sorted((measure(code) for _ in range(runs)), key=lambda result: result["wall_ms"])
+        print({"entry_point": name, **results[len(results) // 2]})
+
+if __name__ == "__main__":
+    main()
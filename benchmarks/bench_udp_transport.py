@@ -0,0 +1,123 @@
+"""
+Compare pushing status colors over the WLED UDP realtime protocols with the HTTP JSON API,
+checking every frame the fake receiver decodes and the automatic fallback to HTTP when UDP fails.
+Run with: python benchmarks/bench_udp_transport.py [pushes] [led_count]
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long,wrong-import-position
+import os
+import socket
+import statistics
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config_handler
+from fake_wled import FakeRealtimeReceiver, FakeWLED
+from light_handler import LightClient, light_payload
+
+COLORS = config_handler.build_color_table({"busy": "(255, 0, 0)", "away": "(255, 255, 0)", "available": "(0, 255, 0)"})
+STATUSES = ("Busy", "Available", "Away", "Unknown")
+
+def summarize(name: str, samples: list, **extra) -> dict:
+    """
+    Summarize push latencies.
+    :param name: The name of the measured transport.
+    :type name: str
+    :param samples: The latencies in seconds.
+    :type samples: list
+    :return: dict: The mean, median and 95th percentile latency in milliseconds, and any extra fields.
+    """
+    samples = sorted(samples)
+    return {"transport": name, "pushes": len(samples), "mean_ms": round(statistics.fmean(samples) * 1000, 4), "p50_ms": round(samples[len(samples) // 2] * 1000, 4),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 4), **extra}
+
+def bench_http(server: FakeWLED, pushes: int) -> dict:
+    """
+    Measure status pushes over the JSON API until the light answered, checking the state the fake light received.
+    :param server: The fake light.
+    :type server: FakeWLED
+    :param pushes: The number of pushes.
+    :type pushes: int
+    :return: dict: The latency summary.
+    """
+    client = LightClient(config_handler.LightConfig("Light", server.url, COLORS))
+    samples = []
+    for i in range(pushes):
+        status = STATUSES[i % len(STATUSES)]
+        start = time.perf_counter()
+        assert client.push_state(status, light_payload(status, COLORS))
+        samples.append(time.perf_counter() - start)
+        if status != "Unknown":
+            assert server.state["seg"][0]["col"][0] == list(COLORS.rgb[status]), server.state
+    client.close()
+    return summarize("http", samples)
+
+def bench_udp(server: FakeWLED, protocol: str, pushes: int, led_count: int) -> dict:
+    """
+    Measure status pushes over a UDP realtime protocol until the fake receiver decoded the whole frame, checking every LED.
+    :param server: The fake light, answering the LED count query.
+    :type server: FakeWLED
+    :param protocol: The realtime protocol ("drgb", "dnrgb" or "ddp").
+    :type protocol: str
+    :param pushes: The number of pushes.
+    :type pushes: int
+    :param led_count: The number of LEDs of the fake light.
+    :type led_count: int
+    :return: dict: The latency summary, packet counts and invalid packet count.
+    """
+    receiver = FakeRealtimeReceiver(led_count).start()
+    client = LightClient(config_handler.LightConfig("Light", server.url, COLORS, protocol, 0, receiver.port))
+    samples = []
+    try:
+        for i in range(pushes):
+            status = STATUSES[i % len(STATUSES)]
+            receiver.frame_event.clear()
+            start = time.perf_counter()
+            assert client.push_state(status, light_payload(status, COLORS))
+            assert receiver.frame_event.wait(1), f"{protocol} frame {i} not received"
+            samples.append(receiver.received_at - start)
+            expected = COLORS.rgb.get(status, (0, 0, 0))
+            assert receiver.color(0) == expected and receiver.color(led_count - 1) == expected, (status, receiver.color(0))
+        assert receiver.invalid == 0 and (protocol == "ddp" or receiver.timeout == 255)
+    finally:
+        client.close()
+        receiver.stop()
+    return summarize(protocol, samples, packets_per_push=receiver.packets // max(receiver.frames, 1), invalid=receiver.invalid)
+
+def check_fallback(server: FakeWLED) -> dict:
+    """
+    Push to a UDP port nobody listens on and check that the light is updated over HTTP once the ICMP error comes back.
+    :param server: The fake light.
+    :type server: FakeWLED
+    :return: dict: Whether the light ended up with the expected color, out of realtime mode.
+    """
+    closed = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    closed.bind(("127.0.0.1", 0))
+    port = closed.getsockname()[1]
+    closed.close()
+    client = LightClient(config_handler.LightConfig("Light", server.url, COLORS, "drgb", 30, port))
+    before = server.requests.get("POST", 0)
+    results = [client.push_state(status, light_payload(status, COLORS)) for status in ("Busy", "Away", "Available")]
+    client.close()
+    return {"transport": "drgb-fallback", "ok": all(results), "http_posts": server.requests.get("POST", 0) - before,
+            "color": server.state["seg"][0]["col"][0], "live": server.state.get("live")}
+
+def main():
+    """
+    Run the HTTP and UDP variants and print the comparison.
+    :param None
+    :return: None
+    """
+    pushes = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    led_count = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    server = FakeWLED(led_count=led_count).start()
+    try:
+        print(bench_http(server, pushes))
+        for protocol in ("drgb", "dnrgb", "ddp"):
+            print(bench_udp(server, protocol, pushes, led_count))
+        print(check_fallback(server))
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Check that running --history next to the running application leaves the status history intact.
+The application records transitions, --history runs in a second process while a transition
+is not recorded yet, then the application records that transition and restarts:
+the timeline must hold every transition exactly once.
+Run with: python benchmarks/check_history_readers.py
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long,wrong-import-position
+import datetime
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+from generate_teams_log import status_line
+from status_history import CHECKPOINT_SUFFIX, StatusHistory
+
+def log_status(path: str, timestamp: datetime.datetime, status: str):
+    """
+    Append a status line to the Teams log.
+    :param path: The Teams log.
+    :type path: str
+    :param timestamp: The time of the status line.
+    :type timestamp: datetime.datetime
+    :param status: The status to log.
+    :type status: str
+    :return: None
+    """
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(status_line(timestamp, 1, status))
+
+def digest(paths: list) -> str:
+    """
+    Hash the content of files, so that changes to them can be detected.
+    :param paths: The files to hash; missing files hash as empty.
+    :type paths: list
+    :return: str: The combined hash.
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                h.update(f.read())
+        h.update(b"\0")
+    return h.hexdigest()
+
+def main():
+    """
+    Run the application's history writer and a --history process against the same history file and check the timeline.
+    :param None
+    :return: None
+    """
+    midnight = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    with tempfile.TemporaryDirectory() as directory:
+        log = os.path.join(directory, "MSTeams_1.log")
+        history_path = os.path.join(directory, "status_history.bin")
+        with open(os.path.join(directory, "config.ini"), "w", encoding="utf-8") as f:
+            f.write(f"[Settings]\nlight_ip = 127.0.0.1:9\nbusy = (255, 0, 0)\naway = (255, 255, 0)\navailable = (0, 255, 0)\nteams_log_path = {log}\nhistory_file = {history_path}\n")
+        log_status(log, midnight + datetime.timedelta(seconds=1), "Available")
+        log_status(log, midnight + datetime.timedelta(seconds=2), "Busy")
+        application = StatusHistory(history_path)
+        assert application.update(log) == 2
+        log_status(log, midnight + datetime.timedelta(seconds=3), "Away")
+        before = digest([history_path, history_path + CHECKPOINT_SUFFIX])
+        result = subprocess.run([sys.executable, os.path.join(SRC, "main.py"), "--history"], cwd=directory, capture_output=True, text=True, check=True)
+        assert "Away:" in result.stdout, f"--history missed the unrecorded transition: {result.stdout!r}"
+        assert digest([history_path, history_path + CHECKPOINT_SUFFIX]) == before, "--history wrote to the status history"
+        assert application.update(log) == 1
+        restarted = StatusHistory(history_path)
+        timeline = [(timestamp - midnight.timestamp(), status) for timestamp, status in restarted.transitions(0, float("inf"))]
+        assert timeline == [(1, "Available"), (2, "Busy"), (3, "Away")], f"timeline after restart: {timeline}"
+        print({"history_output": result.stdout.strip().splitlines(), "timeline_after_restart": timeline, "history_files_untouched_by_reader": True})
+
+if __name__ == "__main__":
+    main()
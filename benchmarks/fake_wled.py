@@ -0,0 +1,249 @@
+"""
+Local stand-ins for the WLED JSON API, serving /json/state and /json/info over HTTP/1.1 with keep-alive,
+and for the WLED UDP realtime receiver, decoding and checking DRGB, DNRGB and DDP packets.
+Used by the benchmarks to measure the light handler without a real device.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import json
+import random
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeWLEDHandler(BaseHTTPRequestHandler):
+    """
+    Request handler implementing GET and POST on /json/state and GET on /json/info.
+    :param self
+    :return: None
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self): # pylint: disable=invalid-name
+        """
+        Return the current light state, or the LED count on /json/info.
+        :param self
+        :return: None
+        """
+        if self.path == "/json/info":
+            self._respond({"leds": {"count": self.server.led_count}})
+            return
+        self._respond(self.server.state)
+
+    def do_POST(self): # pylint: disable=invalid-name
+        """
+        Merge the posted state into the current light state.
+        :param self
+        :return: None
+        """
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        payload = json.loads(body or b"{}")
+        with self.server.lock:
+            self.server.state.update(payload)
+            self.server.posted_at = time.time()
+        self._respond({"success": True})
+
+    def _respond(self, payload: dict):
+        """
+        Send a JSON response after the configured latency.
+        :param self
+        :param payload: The JSON body to send.
+        :type payload: dict
+        :return: None
+        """
+        with self.server.lock:
+            self.server.requests[self.command] = self.server.requests.get(self.command, 0) + 1
+        if self.path not in ("/json/state", "/json/info"):
+            self.send_error(404)
+            return
+        time.sleep(self.server.latency)
+        if self.server.failure_rate and self.server.random.random() < self.server.failure_rate:
+            with self.server.lock:
+                self.server.failures += 1
+            self.send_error(500)
+            return
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args): # pylint: disable=redefined-builtin
+        pass
+
+class FakeWLED(ThreadingHTTPServer):
+    """
+    Fake WLED device listening on localhost, counting requests and TCP connections and recording when the state was last posted.
+    :param self
+    :param latency: Seconds to wait before answering each request.
+    :type latency: float
+    :param failure_rate: Fraction of requests answered with an HTTP 500 error, from 0 to 1.
+    :type failure_rate: float
+    :param seed: Seed for the failure randomness, for reproducible runs.
+    :type seed: int
+    :param led_count: The LED count reported on /json/info.
+    :type led_count: int
+    :return: None
+    """
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0, led_count: int = 30):
+        super().__init__(("127.0.0.1", 0), FakeWLEDHandler)
+        self.led_count = led_count
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.failures = 0
+        self.lock = threading.Lock()
+        self.state = {"on": True, "bri": 254, "seg": [{"id": 0, "col": [[0, 255, 0]]}]}
+        self.connections = 0
+        self.requests = {}
+        self.posted_at = None
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        The JSON state URL of the fake light.
+        :param self
+        :return: str: The URL to use as light_url.
+        """
+        return f"http://127.0.0.1:{self.server_address[1]}/json/state"
+
+    def start(self):
+        """
+        Serve requests on a background thread.
+        :param self
+        :return: FakeWLED: The started server.
+        """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the listening socket.
+        :param self
+        :return: None
+        """
+        self.shutdown()
+        self.server_close()
+
+class FakeRealtimeReceiver():
+    """
+    Fake WLED UDP realtime receiver listening on localhost, decoding DRGB, DNRGB and DDP packets into an LED buffer.
+    Packets with an unknown protocol, a bad header or LEDs out of range are counted as invalid.
+    :param self
+    :param led_count: The number of LEDs of the fake light.
+    :type led_count: int
+    :return: None
+    """
+    def __init__(self, led_count: int = 30):
+        self.led_count = led_count
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("127.0.0.1", 0))
+        self.lock = threading.Lock()
+        self.frame_event = threading.Event()
+        self.pixels = bytearray(led_count * 3)
+        self.packets = 0
+        self.frames = 0
+        self.invalid = 0
+        self.timeout = None
+        self.received_at = None
+        self.thread = None
+
+    @property
+    def port(self) -> int:
+        """
+        The UDP port of the fake receiver.
+        :param self
+        :return: int: The port to use as udp_port.
+        """
+        return self.socket.getsockname()[1]
+
+    def start(self):
+        """
+        Receive packets on a background thread.
+        :param self
+        :return: FakeRealtimeReceiver: The started receiver.
+        """
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop receiving and close the socket.
+        :param self
+        :return: None
+        """
+        self.socket.close()
+
+    def color(self, index: int = 0) -> tuple:
+        """
+        Return the color of one LED.
+        :param self
+        :param index: The LED index.
+        :type index: int
+        :return: tuple: The (r, g, b) color.
+        """
+        with self.lock:
+            return tuple(self.pixels[index * 3:index * 3 + 3])
+
+    def _run(self):
+        """
+        Receiver thread body.
+        :param self
+        :return: None
+        """
+        while True:
+            try:
+                packet = self.socket.recv(65535)
+            except OSError:
+                return
+            received_at = time.perf_counter()
+            with self.lock:
+                self.packets += 1
+                if self._apply(packet):
+                    self.frames += 1
+                    self.received_at = received_at
+                    self.frame_event.set()
+
+    def _apply(self, packet: bytes) -> bool:
+        """
+        Decode one packet into the LED buffer.
+        :param self
+        :param packet: The received packet.
+        :type packet: bytes
+        :return: bool: Whether the packet completed a frame.
+        """
+        if len(packet) >= 10 and packet[0] & 0xC0 == 0x40:
+            flags, _, data_type, destination, offset, length = struct.unpack_from(">BBBBIH", packet)
+            data = packet[10:]
+            if data_type != 0x0B or destination != 1 or length != len(data) or offset + length > len(self.pixels):
+                self.invalid += 1
+                return False
+            self.pixels[offset:offset + length] = data
+            return bool(flags & 0x01)
+        if len(packet) >= 2 and packet[0] == 2:
+            start, data = 0, packet[2:]
+        elif len(packet) >= 4 and packet[0] == 4:
+            start, data = packet[2] << 8 | packet[3], packet[4:]
+        else:
+            self.invalid += 1
+            return False
+        if len(data) % 3 or start * 3 + len(data) > len(self.pixels):
+            self.invalid += 1
+            return False
+        self.timeout = packet[1]
+        self.pixels[start * 3:start * 3 + len(data)] = data
+        return start * 3 + len(data) == len(self.pixels)
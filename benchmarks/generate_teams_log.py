@@ -0,0 +1,97 @@
+"""
+Generate synthetic MSTeams log files of a given size with realistic status lines,
+for benchmarking the Teams log handling without a Teams installation.
+Run with: python benchmarks/generate_teams_log.py <output> <size, e.g. 1MB or 2GB> [--status-every N] [--seed N]
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import argparse
+import datetime
+import random
+
+STATUSES = ("Available", "Busy", "Away", "Do not disturb")
+BADGES = {"Available": "available", "Busy": "busy", "Away": "away", "Do not disturb": "doNotDisturb"}
+FILLER = ("<INFO> native_modules::PowerMonitor: Received power event: resume",
+          "<INFO> TelemetryService: Sending batch of 24 events",
+          "<DBG> WebViewHost: Navigation completed for frame 0x3f2a",
+          "<INFO> CalendarService: Syncing upcoming meetings, count=3",
+          "<WARN> NetworkMonitor: Connectivity changed, online=true type=wifi",
+          "<INFO> ChatService: Message received in conversation 19:meeting_ZmFrZQ@thread.v2")
+UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+def parse_size(value: str) -> int:
+    """
+    Parse a size such as "512KB", "1MB" or "3GB" into bytes.
+    :param value: The size to parse.
+    :type value: str
+    :return: int: The size in bytes.
+    """
+    value = value.strip().upper()
+    for unit, factor in UNITS.items():
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * factor)
+    return int(value)
+
+def status_line(timestamp: datetime.datetime, thread: int, status: str) -> str:
+    """
+    Format a Teams badge update line carrying a status.
+    :param timestamp: The time of the log line.
+    :type timestamp: datetime.datetime
+    :param thread: The thread id shown in the log line.
+    :type thread: int
+    :param status: The status to log.
+    :type status: str
+    :return: str: The log line, including the newline.
+    """
+    return f"{timestamp.isoformat()} 0x{thread:08x} <INFO> TaskbarBadgeServiceLegacy:Work: SetBadge Setting badge: {BADGES[status]}, status {status}\n"
+
+def generate(path: str, size: int, status_every: int = 2000, seed: int = 0) -> str:
+    """
+    Write a synthetic Teams log of at least the given size, streaming it in chunks.
+    :param path: The file to write.
+    :type path: str
+    :param size: The minimum size of the file in bytes.
+    :type size: int
+    :param status_every: The average number of lines between two status lines.
+    :type status_every: int
+    :param seed: Seed for the randomness, for reproducible logs.
+    :type seed: int
+    :return: str: The last status written to the log.
+    """
+    rng = random.Random(seed)
+    timestamp = datetime.datetime(2024, 1, 8, 8, 0, tzinfo=datetime.timezone.utc)
+    status = "Available"
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(status_line(timestamp, 1, status))
+        while written < size:
+            lines = []
+            for _ in range(1000):
+                timestamp += datetime.timedelta(milliseconds=rng.randint(1, 400))
+                thread = rng.randint(1, 0xffff)
+                if rng.randrange(status_every) == 0:
+                    status = rng.choice(STATUSES)
+                    lines.append(status_line(timestamp, thread, status))
+                else:
+                    lines.append(f"{timestamp.isoformat()} 0x{thread:08x} {rng.choice(FILLER)}\n")
+            chunk = "".join(lines)
+            f.write(chunk)
+            written += len(chunk)
+    return status
+
+def main():
+    """
+    Parse the command line and generate the log.
+    :param None
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Generate a synthetic MSTeams log file.")
+    parser.add_argument("output", help="The log file to write.")
+    parser.add_argument("size", help="The size of the log, e.g. 1MB or 2GB.")
+    parser.add_argument("--status-every", type=int, default=2000, help="Average number of lines between status lines.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for reproducible logs.")
+    args = parser.parse_args()
+    print(generate(args.output, parse_size(args.size), args.status_every, args.seed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Reproducible benchmark suite for the status sync hot path, run against a local fake WLED server
+and synthetic Teams logs. Results are printed (or written) as JSON so they can be compared between versions.
+Run with: python benchmarks/run_benchmarks.py [--sizes 1MB,64MB] [--iterations N] [--latency S] [--failure-rate F] [--output results.json]
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long,wrong-import-position
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+import config_handler
+import light_handler
+import status_history
+import teams_handler
+from fake_wled import FakeWLED
+from generate_teams_log import generate, parse_size, status_line
+
+def timed(func, iterations: int, setup=None) -> dict:
+    """
+    Call a function repeatedly and summarize its latency.
+    :param func: The function to measure.
+    :type func: callable
+    :param iterations: The number of calls to measure.
+    :type iterations: int
+    :param setup: Function called before each measured call, outside of the timing (optional).
+    :type setup: callable or None
+    :return: dict: The mean, median, 95th percentile, minimum and maximum latency in milliseconds.
+    """
+    samples = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"iterations": iterations, "mean_ms": round(statistics.fmean(samples), 4), "p50_ms": round(samples[len(samples) // 2], 4),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4), "min_ms": round(samples[0], 4), "max_ms": round(samples[-1], 4)}
+
+def version() -> str:
+    """
+    Describe the version of the code being measured.
+    :param None
+    :return: str: The git description of the working tree, or "unknown" outside of git.
+    """
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=SRC, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def bench_extract_status(directory: str, size: int, iterations: int) -> list:
+    """
+    Measure extract_status on a synthetic log: a cold full scan, an idle tick and a tick after an appended status line.
+    :param directory: The directory to write the log into.
+    :type directory: str
+    :param size: The size of the log in bytes.
+    :type size: int
+    :param iterations: The number of calls to measure.
+    :type iterations: int
+    :return: list: The benchmark results.
+    """
+    path = os.path.join(directory, f"MSTeams_{size}.log")
+    generate(path, size)
+    config_handler.LOADED_CONFIG["teams_log_path"] = path
+    params = {"log_bytes": os.path.getsize(path)}
+    def reset():
+        teams_handler._TAILER = teams_handler.LogTailer() # pylint: disable=protected-access
+    def append():
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(status_line(datetime.datetime.now(datetime.timezone.utc), 1, "Busy"))
+    results = [{"name": "extract_status.cold", "params": params, **timed(teams_handler.extract_status, iterations, reset)}]
+    teams_handler.extract_status()
+    results.append({"name": "extract_status.idle", "params": params, **timed(teams_handler.extract_status, iterations)})
+    results.append({"name": "extract_status.append", "params": params, **timed(teams_handler.extract_status, iterations, append)})
+    os.remove(path)
+    return results
+
+def bench_status_history(directory: str, size: int, iterations: int) -> list:
+    """
+    Measure the status history on a synthetic log: a cold streaming scan, a resume from the checkpoint after a restart and an update after an appended status line.
+    :param directory: The directory to write the log and history into.
+    :type directory: str
+    :param size: The size of the log in bytes.
+    :type size: int
+    :param iterations: The number of calls to measure.
+    :type iterations: int
+    :return: list: The benchmark results.
+    """
+    path = os.path.join(directory, f"MSTeams_history_{size}.log")
+    history_path = os.path.join(directory, "status_history.bin")
+    generate(path, size)
+    params = {"log_bytes": os.path.getsize(path)}
+    statuses = iter(["Busy", "Away"] * iterations)
+    def reset():
+        for stale in (history_path, history_path + status_history.CHECKPOINT_SUFFIX):
+            if os.path.exists(stale):
+                os.remove(stale)
+    def append():
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(status_line(datetime.datetime.now(datetime.timezone.utc), 1, next(statuses)))
+    results = [{"name": "status_history.cold", "params": params, **timed(lambda: status_history.StatusHistory(history_path).update(path), iterations, reset)}]
+    results.append({"name": "status_history.resume", "params": params, **timed(lambda: status_history.StatusHistory(history_path).update(path), iterations)})
+    history = status_history.StatusHistory(history_path)
+    results.append({"name": "status_history.append", "params": params, **timed(lambda: history.update(path), iterations, append)})
+    reset()
+    os.remove(path)
+    return results
+
+def bench_light(server: FakeWLED, log_path: str, iterations: int) -> list:
+    """
+    Measure get_light_status, update_light and full status update ticks against the fake light.
+    :param server: The fake light.
+    :type server: FakeWLED
+    :param log_path: The Teams log the ticks read the status from.
+    :type log_path: str
+    :param iterations: The number of calls to measure.
+    :type iterations: int
+    :return: list: The benchmark results.
+    """
+    config_handler.LOADED_CONFIG["teams_log_path"] = log_path
+    client = light_handler.get_clients()[0]
+    state = client.fetch_state() or {"on": True, "seg": [{"id": 0, "col": [[0, 255, 0]]}]}
+    statuses = iter(["Busy", "Away"] * iterations)
+    def append_status():
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(f"bench status {next(statuses)}\n")
+    params = {"latency_s": server.latency, "failure_rate": server.failure_rate}
+    results = [
+        {"name": "get_light_status.parse", "params": {}, **timed(lambda: light_handler.get_light_status(state), iterations)},
+        {"name": "get_light_status.fetch", "params": params, **timed(lambda: light_handler.get_light_status(client.fetch_state()), iterations)},
+        {"name": "update_light", "params": params, **timed(lambda: client.push_state("Busy", light_handler.light_payload("Busy", client.colors)), iterations)},
+        {"name": "update_status.tick_steady", "params": params, **timed(light_handler.sync_light, iterations)},
+    ]
+    posts = server.requests.get("POST", 0)
+    results.append({"name": "update_status.tick_changed", "params": params, **timed(light_handler.sync_light, iterations, append_status)})
+    posts = server.requests.get("POST", 0) - posts
+    assert server.failure_rate or posts == iterations, f"update_status.tick_changed posted {posts} of {iterations} status changes to the light"
+    results[-1]["posts"] = posts
+    results.append({"name": "update_status.tick_reconcile", "params": params, **timed(light_handler.sync_light, iterations, client.shadow.invalidate)})
+    return results
+
+def main():
+    """
+    Run the benchmark suite and output the results as JSON.
+    :param None
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the status sync hot path.")
+    parser.add_argument("--sizes", default="1MB,16MB", help="Comma separated Teams log sizes, e.g. 1MB,1GB.")
+    parser.add_argument("--iterations", type=int, default=50, help="Measured calls per benchmark.")
+    parser.add_argument("--latency", type=float, default=0.002, help="Latency of the fake light in seconds.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of fake light requests that fail.")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+    args = parser.parse_args()
+    server = FakeWLED(args.latency, args.failure_rate).start()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            os.chdir(directory)
+            log_path = os.path.join(directory, "MSTeams_tick.log")
+            generate(log_path, parse_size("1MB"))
+            with open("config.ini", "w", encoding="utf-8") as f:
+                f.write(f"[Settings]\nlight_ip = 127.0.0.1:{server.server_address[1]}\nbusy = (255, 0, 0)\naway = (255, 255, 0)\navailable = (0, 255, 0)\nteams_log_path = {log_path}\nhistory_file = \ntransition_dwell = 0\ntransition_hysteresis = 0\n")
+            config_handler.load_config()
+            results = []
+            for size in args.sizes.split(","):
+                results.extend(bench_extract_status(directory, parse_size(size), args.iterations))
+                results.extend(bench_status_history(directory, parse_size(size), args.iterations))
+            results.extend(bench_light(server, log_path, args.iterations))
+        finally:
+            os.chdir(cwd)
+            server.stop()
+    report = {"version": version(), "python": platform.python_version(), "platform": platform.platform(),
+              "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,315 @@
 """
 Configuration handler for managing application settings,
 including light IP, color mappings, and Teams log path.
+The configuration is kept in memory once loaded; changes are written back to disk
+in a single atomic write after a short quiet period,
+and subscribers are told which settings changed.
 Author: Michelfrancis Bustillos
 """
 # pylint: disable=line-too-long
+import atexit
+import json
 import logging
+import os
 import configparser
-from teams_handler import get_teams_path
+import threading
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+import teams_handler
+import log_setup
+from realtime import TRANSPORTS
+from effects import EFFECTS
 
 CONFIG_FILE = "config.ini"
+WRITE_DELAY = 0.5
 ERROR_STATUS = False
 LOADED_CONFIG = dict()
+STATUS_COLORS = {"Available": "available", "Busy": "busy", "Do not disturb": "busy", "Away": "away"}
+
+class ColorTable(NamedTuple):
+    """
+    Immutable table of the status colors and light payloads, built once when the configuration is loaded.
+    :param rgb: The RGB color for each status.
+    :type rgb: Mapping[str, tuple]
+    :param payloads: The pre-serialized JSON light state for each status, including "Unknown" (light off).
+    :type payloads: Mapping[str, bytes]
+    :param by_color: The status for each RGB color, used to read the status back from the light.
+    :type by_color: Mapping[tuple, str]
+    """
+    rgb: Mapping[str, tuple]
+    payloads: Mapping[str, bytes]
+    by_color: Mapping[tuple, str]
+
+class LightConfig(NamedTuple):
+    """
+    Configuration of a single light.
+    :param name: The display name of the light.
+    :type name: str
+    :param url: The JSON state URL of the light.
+    :type url: str
+    :param colors: The color table of the light, with any per-light color overrides applied.
+    :type colors: ColorTable
+    :param transport: How colors are pushed to the light ("http" for the JSON API, or the "drgb", "dnrgb" or "ddp" UDP realtime protocol).
+    :type transport: str
+    :param led_count: The number of LEDs of the light for the UDP realtime protocols (0 to ask the light).
+    :type led_count: int
+    :param udp_port: The UDP port of the light (0 for the protocol default).
+    :type udp_port: int
+    """
+    name: str
+    url: str
+    colors: ColorTable
+    transport: str = "http"
+    led_count: int = 0
+    udp_port: int = 0
+
+COLOR_TABLE = None
+
+class ConfigStore():
+    """
+    Authoritative in-memory copy of the configuration file with coalesced, atomic write-behind.
+    Changes are applied in memory immediately and written to disk once no further change arrived for the write delay.
+    :param self
+    :param path: The configuration file path.
+    :type path: str
+    :param write_delay: Seconds without changes before pending changes are written to disk.
+    :type write_delay: float
+    :return: None
+    """
+    def __init__(self, path: str, write_delay: float = WRITE_DELAY):
+        self.path = path
+        self.write_delay = write_delay
+        self.config = configparser.ConfigParser()
+        self.lock = threading.RLock()
+        self.timer = None
+        self.dirty = False
+        self.writes = 0
+        self.subscribers = []
+
+    def read(self):
+        """
+        Replace the in-memory configuration with the contents of the configuration file.
+        :param self
+        :return: None
+        """
+        config = configparser.ConfigParser()
+        config.read(self.path)
+        with self.lock:
+            self.config = config
+            self.dirty = False
+
+    def replace(self, config: configparser.ConfigParser):
+        """
+        Replace the whole configuration and write it to disk right away.
+        :param self
+        :param config: The new configuration.
+        :type config: configparser.ConfigParser
+        :return: None
+        """
+        with self.lock:
+            self.config = config
+            self.dirty = True
+            self.flush()
+
+    def set(self, section: str, option: str, value: str) -> bool:
+        """
+        Change a setting in memory and schedule a write to disk, postponing any write already scheduled.
+        :param self
+        :param section: The configuration section.
+        :type section: str
+        :param option: The setting name.
+        :type option: str
+        :param value: The new value.
+        :type value: str
+        :return: bool: Whether the value changed.
+        """
+        with self.lock:
+            if not self.config.has_section(section):
+                self.config.add_section(section)
+            if self.config.get(section, option, fallback=None) == value:
+                return False
+            self.config.set(section, option, value)
+            self.dirty = True
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.write_delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+            return True
+
+    def flush(self):
+        """
+        Write pending changes to disk through a temporary file and a rename, so the file is never left half written.
+        :param self
+        :return: None
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.dirty:
+                return
+            temporary = self.path + ".tmp"
+            try:
+                with open(temporary, "w", encoding="utf-8") as configfile:
+                    self.config.write(configfile)
+                os.replace(temporary, self.path)
+            except OSError as e:
+                logging.error("Error writing configuration to %s: %s", self.path, e)
+                return
+            self.dirty = False
+            self.writes += 1
+        logging.info("Configuration saved to file: %s", self.path)
+
+    def subscribe(self, callback):
+        """
+        Register a function called with the set of changed LOADED_CONFIG keys whenever the configuration changes.
+        Callbacks run on the thread that changed the configuration.
+        :param self
+        :param callback: The function to call.
+        :type callback: callable
+        :return: None
+        """
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        Remove a previously registered change callback.
+        :param self
+        :param callback: The function to remove.
+        :type callback: callable
+        :return: None
+        """
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def notify(self, changed: set):
+        """
+        Call the subscribers with the changed keys.
+        :param self
+        :param changed: The changed LOADED_CONFIG keys.
+        :type changed: set
+        :return: None
+        """
+        for callback in list(self.subscribers):
+            try:
+                callback(changed)
+            except Exception as e: # pylint: disable=broad-exception-caught
+                logging.error("Error in configuration change callback: %s", e)
+
+STORE = ConfigStore(CONFIG_FILE)
+atexit.register(STORE.flush)
+
+def parse_color(value: str) -> tuple:
+    """
+    Parse a color setting such as "(255, 0, 0)" into an RGB tuple.
+    :param value: The color setting to parse.
+    :type value: str
+    :return: tuple: The (r, g, b) color.
+    :raises ValueError: If the setting is not three integers between 0 and 255.
+    """
+    try:
+        color = tuple(int(part) for part in value.strip().strip("()").split(","))
+    except ValueError:
+        color = ()
+    if len(color) != 3 or any(not 0 <= part <= 255 for part in color):
+        raise ValueError(f"Invalid color setting: {value!r}, expected (R, G, B) with values from 0 to 255.")
+    return color
+
+def build_color_table(colors: dict) -> ColorTable:
+    """
+    Build the color table from the color settings.
+    :param colors: The color setting for "busy", "away" and "available".
+    :type colors: dict
+    :return: ColorTable: The parsed colors, serialized payloads and reverse color lookup.
+    :raises ValueError: If a color setting is invalid.
+    """
+    parsed = {name: parse_color(value) for name, value in colors.items()}
+    rgb = {status: parsed[name] for status, name in STATUS_COLORS.items()}
+    payloads = {status: json.dumps({"on": True, "seg": [{"id": 0, "col": [list(color)]}], "bri": 254}, separators=(",", ":")).encode("utf-8") for status, color in rgb.items()}
+    payloads["Unknown"] = json.dumps({"on": False}, separators=(",", ":")).encode("utf-8")
+    by_color = {}
+    for status in ("Available", "Busy", "Away"):
+        by_color.setdefault(rgb[status], status)
+    return ColorTable(MappingProxyType(rgb), MappingProxyType(payloads), MappingProxyType(by_color))
+
+class UserConfig(NamedTuple):
+    """
+    Configuration of one user in office mode: whose Teams log drives which lights.
+    :param name: The name of the user.
+    :type name: str
+    :param teams_log_path: The glob pattern of the user's Teams log files.
+    :type teams_log_path: str
+    :param lights: The configuration of each light of the user.
+    :type lights: tuple
+    """
+    name: str
+    teams_log_path: str
+    lights: tuple
+
+def light_options(config: configparser.ConfigParser, section: str) -> dict:
+    """
+    Read the transport settings of a light.
+    :param config: The configuration.
+    :type config: configparser.ConfigParser
+    :param section: The section of the light.
+    :type section: str
+    :return: dict: The transport, led_count and udp_port of the light.
+    :raises ValueError: If a transport setting is invalid.
+    """
+    transport = config.get(section, "transport", fallback="http").strip().lower()
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Invalid transport setting in [{section}]: {transport!r}, expected one of {', '.join(TRANSPORTS)}.")
+    return {"transport": transport, "led_count": config.getint(section, "led_count", fallback=0), "udp_port": config.getint(section, "udp_port", fallback=0)}
+
+def load_users(config: configparser.ConfigParser, lights: list) -> tuple:
+    """
+    Read the office mode mapping of users to lights from the [User <name>] sections.
+    Each section has a teams_log_path and a comma separated list of light names ("Light" for the light in [Settings], or the name of a [Light <name>] section).
+    :param config: The configuration.
+    :type config: configparser.ConfigParser
+    :param lights: The configured lights.
+    :type lights: list
+    :return: tuple: The UserConfig of each user.
+    :raises ValueError: If a user has no Teams log path, refers to an unknown light or shares a light with another user.
+    """
+    by_name = {light.name: light for light in lights}
+    owners = {}
+    users = []
+    for section in config.sections():
+        if not section.startswith("User "):
+            continue
+        name = section[len("User "):]
+        pattern = config.get(section, "teams_log_path", fallback="").strip()
+        if not pattern:
+            raise ValueError(f"Missing teams_log_path in [{section}].")
+        user_lights = []
+        for light_name in (part.strip() for part in config.get(section, "lights", fallback="").split(",")):
+            if not light_name:
+                continue
+            if light_name not in by_name:
+                raise ValueError(f"Unknown light {light_name!r} in [{section}].")
+            if owners.setdefault(light_name, name) != name:
+                raise ValueError(f"Light {light_name!r} is assigned to both {owners[light_name]} and {name}.")
+            user_lights.append(by_name[light_name])
+        users.append(UserConfig(name, pattern, tuple(user_lights)))
+    return tuple(users)
+
+def load_effects(config: configparser.ConfigParser) -> Mapping[str, str]:
+    """
+    Read the effect shown for each status on lights with a UDP realtime transport.
+    :param config: The configuration.
+    :type config: configparser.ConfigParser
+    :return: Mapping[str, str]: The effect name for each status.
+    :raises ValueError: If an effect setting is invalid.
+    """
+    effects = {}
+    for status, name in STATUS_COLORS.items():
+        effect = config.get("Settings", f"{name}_effect", fallback="solid").strip().lower()
+        if effect not in EFFECTS:
+            raise ValueError(f"Invalid effect setting {name}_effect: {effect!r}, expected one of {', '.join(EFFECTS)}.")
+        effects[status] = effect
+    return MappingProxyType(effects)
 
 def generate_default_config():
     """
@@ -20,13 +319,37 @@ def generate_default_config():
     """
     config = configparser.ConfigParser()
     config["Settings"] = {'light_ip': "0.0.0.0", 'busy': "(255, 0, 0)", 'away': "(255, 255, 0)", 'available': "(0, 255, 0)"}
-    config.set("Settings", "teams_log_path", get_teams_path())
+    config.set("Settings", "teams_log_path", teams_handler.teams_log_pattern())
+    config.set("Settings", "transport", "http")
+    config.set("Settings", "busy_effect", "solid")
+    config.set("Settings", "away_effect", "solid")
+    config.set("Settings", "available_effect", "solid")
+    config.set("Settings", "effect_fps", "30")
+    config.set("Settings", "effect_period", "2")
     config.set("Settings", "tray_minimize", "False")
     config.set("Settings", "manual_override", "False")
+    config.set("Settings", "watch_debounce_ms", "250")
+    config.set("Settings", "reconcile_interval", "300")
+    config.set("Settings", "poll_min_interval", "2")
+    config.set("Settings", "poll_max_interval", "60")
+    config.set("Settings", "transition_dwell", "0")
+    config.set("Settings", "transition_hysteresis", "0")
+    config.set("Settings", "metrics_port", "0")
+    config.set("Settings", "metrics_summary_interval", "300")
+    config.set("Settings", "push_port", "0")
+    config.set("Settings", "push_host", "127.0.0.1")
+    config.set("Settings", "office_workers", "16")
+    config.set("Settings", "office_light_workers", "16")
+    config.set("Settings", "office_poll_interval", "0.25")
+    config.set("Settings", "log_file", "debug.log")
+    config.set("Settings", "log_level", "DEBUG")
+    config.set("Settings", "log_levels", log_setup.DEFAULT_LEVELS)
+    config.set("Settings", "log_max_bytes", str(log_setup.DEFAULT_MAX_BYTES))
+    config.set("Settings", "log_backup_count", str(log_setup.DEFAULT_BACKUP_COUNT))
+    config.set("Settings", "history_file", "status_history.bin")
     logging.info("Default configuration generated.")
-    with open(CONFIG_FILE, "w", encoding="utf-8") as configfile:
-        config.write(configfile)
-    load_config()
+    STORE.replace(config)
+    apply_config()
 
 def load_config():
     """
@@ -34,20 +357,83 @@ def load_config():
     :param None
     :return Dict: The loaded configuration containing the light IP, color mappings, Teams log path, and other settings.
     """
-    config = configparser.ConfigParser()
-    config.read(CONFIG_FILE)
+    STORE.read()
     logging.info("Configuration loaded from file: %s", CONFIG_FILE)
-    global LOADED_CONFIG
+    apply_config()
+
+def apply_config():
+    """
+    Rebuild LOADED_CONFIG and the color table from the in-memory configuration and notify the subscribers of the changed keys.
+    :param None
+    :return: None
+    :raises ValueError: If a color or effect setting is invalid or a light has no ip.
+    """
+    global LOADED_CONFIG, COLOR_TABLE
+    with STORE.lock:
+        config = configparser.ConfigParser()
+        config.read_dict(STORE.config)
+    try:
+        colors = {name: config.get("Settings", name) for name in ("busy", "away", "available")}
+        COLOR_TABLE = build_color_table(colors)
+        lights = [LightConfig("Light", f"http://{config.get('Settings', 'light_ip')}/json/state", COLOR_TABLE, **light_options(config, "Settings"))]
+        for section in config.sections():
+            if section.startswith("Light "):
+                ip = config.get(section, "ip", fallback=None)
+                if not ip:
+                    raise ValueError(f"[{section}] is missing 'ip'.")
+                overrides = {name: config.get(section, name, fallback=value) for name, value in colors.items()}
+                lights.append(LightConfig(section[len("Light "):], f"http://{ip}/json/state", build_color_table(overrides), **light_options(config, section)))
+        effects = load_effects(config)
+        effect_fps = config.getint("Settings", "effect_fps", fallback=30)
+        effect_period = config.getfloat("Settings", "effect_period", fallback=2.0)
+        if effect_fps <= 0 or effect_period <= 0:
+            raise ValueError(f"Invalid effect_fps or effect_period setting: {effect_fps}, {effect_period}, expected values > 0.")
+        users = load_users(config, lights)
+        log_level = config.get("Settings", "log_level", fallback="DEBUG").strip().upper()
+        if not isinstance(logging.getLevelName(log_level), int):
+            raise ValueError(f"Invalid log_level setting: {log_level!r}.")
+        log_levels = log_setup.parse_levels(config.get("Settings", "log_levels", fallback=log_setup.DEFAULT_LEVELS))
+    except ValueError as e:
+        logging.error("Error loading light settings from %s: %s", CONFIG_FILE, e)
+        raise
+    previous = LOADED_CONFIG
     LOADED_CONFIG = {
         "light_ip": config.get("Settings", "light_ip"),
         "light_url": f"http://{config.get('Settings', 'light_ip')}/json/state",
         "busy_color": config.get("Settings", "busy"),
         "away_color": config.get("Settings", "away"),
         "available_color": config.get("Settings", "available"),
+        "lights": tuple(lights),
+        "users": users,
+        "office_workers": config.getint("Settings", "office_workers", fallback=16),
+        "office_light_workers": config.getint("Settings", "office_light_workers", fallback=16),
+        "office_poll_interval": config.getfloat("Settings", "office_poll_interval", fallback=0.25),
         "teams_log_path": config.get("Settings", "teams_log_path"),
         "tray_minimize": config.getboolean("Settings", "tray_minimize", fallback=False),
         "manual_override": config.getboolean("Settings", "manual_override", fallback=False),
+        "watch_debounce_ms": config.getint("Settings", "watch_debounce_ms", fallback=250),
+        "reconcile_interval": config.getfloat("Settings", "reconcile_interval", fallback=300.0),
+        "poll_min_interval": config.getfloat("Settings", "poll_min_interval", fallback=2.0),
+        "poll_max_interval": config.getfloat("Settings", "poll_max_interval", fallback=60.0),
+        "transition_dwell": config.getfloat("Settings", "transition_dwell", fallback=0.0),
+        "transition_hysteresis": config.getfloat("Settings", "transition_hysteresis", fallback=0.0),
+        "metrics_port": config.getint("Settings", "metrics_port", fallback=0),
+        "metrics_summary_interval": config.getfloat("Settings", "metrics_summary_interval", fallback=300.0),
+        "push_port": config.getint("Settings", "push_port", fallback=0),
+        "push_host": config.get("Settings", "push_host", fallback="127.0.0.1"),
+        "log_file": config.get("Settings", "log_file", fallback="debug.log"),
+        "log_level": log_level,
+        "log_levels": log_levels,
+        "log_max_bytes": config.getint("Settings", "log_max_bytes", fallback=log_setup.DEFAULT_MAX_BYTES),
+        "log_backup_count": config.getint("Settings", "log_backup_count", fallback=log_setup.DEFAULT_BACKUP_COUNT),
+        "history_file": config.get("Settings", "history_file", fallback="status_history.bin"),
+        "effects": effects,
+        "effect_fps": effect_fps,
+        "effect_period": effect_period,
     }
+    changed = {key for key, value in LOADED_CONFIG.items() if previous.get(key) != value}
+    if previous and changed:
+        STORE.notify(changed)
 
 def save_config(light_ip=None, status=None, color=None, tray_minimize=None, manual_override=None, teams_log_path=None):
     """
@@ -63,20 +449,23 @@ def save_config(light_ip=None, status=None, color=None, tray_minimize=None, manu
     :param manual_override: The boolean value indicating whether manual override is enabled (optional).
     :type manual_override: bool or None
     :return: None
+    :raises ValueError: If the color is invalid; the configuration is left unchanged.
     """
-    config = configparser.ConfigParser()
-    config.read(CONFIG_FILE)
+    if not STORE.config.has_section("Settings"):
+        STORE.read()
+    changes = {}
     if light_ip:
-        config.set("Settings", "light_ip", light_ip)
+        changes["light_ip"] = light_ip
     if status and color:
-        config.set("Settings", status, str(color))
+        changes[status] = str(tuple(color))
+        parse_color(changes[status])
     if tray_minimize is not None:
-        config.set("Settings", "tray_minimize", str(tray_minimize))
+        changes["tray_minimize"] = str(tray_minimize)
     if manual_override is not None:
-        config.set("Settings", "manual_override", str(manual_override))
+        changes["manual_override"] = str(manual_override)
     if teams_log_path is not None:
-        config.set("Settings", "teams_log_path", teams_log_path)
-    with open(CONFIG_FILE, "w", encoding="utf-8") as configfile:
-        config.write(configfile)
-    logging.info("Configuration saved to file: %s", CONFIG_FILE)
-    load_config()
+        changes["teams_log_path"] = teams_log_path
+    changed = [option for option, value in changes.items() if STORE.set("Settings", option, value)]
+    if changed:
+        logging.info("Configuration changed: %s", ", ".join(changed))
+        apply_config()
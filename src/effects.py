@@ -0,0 +1,160 @@
+"""
+This module renders animated status patterns (pulse, breathe, progress bar) as per-LED RGB frames
+and streams them to a light at a fixed frame rate over a UDP realtime transport.
+Each animation cycle is computed once with NumPy array operations
+and cached per effect, color and LED count,
+so streaming only hands precomputed frames to the network.
+NumPy is optional: without it every status is shown as a solid color.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+# pylint: disable=import-outside-toplevel
+import functools
+import logging
+import threading
+import time
+
+EFFECTS = ("solid", "pulse", "breathe", "progress")
+DEFAULT_FPS = 30
+DEFAULT_PERIOD = 2.0
+FLOOR = 0.08
+PROGRESS_EDGE = 3.0
+NUMPY = None
+
+def numpy_available() -> bool:
+    """
+    Check once whether NumPy can be imported.
+    :param None
+    :return: bool: True if effects other than "solid" can be rendered.
+    """
+    global NUMPY
+    if NUMPY is None:
+        try:
+            # NumPy is an optional dependency and is not in requirements.txt.
+            import numpy # pylint: disable=unused-import,import-error
+            NUMPY = True
+        except ImportError:
+            logging.info("NumPy is not installed, showing every status as a solid color.")
+            NUMPY = False
+    return NUMPY
+
+def brightness(effect: str, frames: int, led_count: int):
+    """
+    Compute the brightness of every LED in every frame of one animation cycle.
+    :param effect: The effect name (see EFFECTS).
+    :type effect: str
+    :param frames: The number of frames of the cycle.
+    :type frames: int
+    :param led_count: The number of LEDs.
+    :type led_count: int
+    :return: numpy.ndarray: Brightness from 0 to 1, of shape (frames, 1) for effects lighting all LEDs alike and (frames, led_count) otherwise.
+    """
+    import numpy as np # pylint: disable=import-error
+    phase = np.arange(frames, dtype=np.float32)[:, None] / frames
+    if effect == "pulse":
+        return FLOOR + (1 - FLOOR) * np.exp(-((phase - 0.5) ** 2) / 0.02)
+    if effect == "breathe":
+        return FLOOR + (1 - FLOOR) * (0.5 - 0.5 * np.cos(2 * np.pi * phase)) ** 2
+    if effect == "progress":
+        position = np.arange(led_count, dtype=np.float32)[None, :]
+        return FLOOR + (1 - FLOOR) * np.clip((phase * (led_count + PROGRESS_EDGE) - position) / PROGRESS_EDGE, 0, 1)
+    return np.ones((frames, 1), dtype=np.float32)
+
+@functools.lru_cache(maxsize=32)
+def frame_cycle(effect: str, color: tuple, led_count: int, fps: int = DEFAULT_FPS, period: float = DEFAULT_PERIOD):
+    """
+    Render one animation cycle of an effect, cached per effect, color, LED count, frame rate and period.
+    :param effect: The effect name (see EFFECTS).
+    :type effect: str
+    :param color: The (r, g, b) color at full brightness.
+    :type color: tuple
+    :param led_count: The number of LEDs.
+    :type led_count: int
+    :param fps: The frame rate the cycle is played at.
+    :type fps: int
+    :param period: The duration of one cycle in seconds.
+    :type period: float
+    :return: numpy.ndarray: Read-only uint8 array of shape (frames, led_count * 3) with the RGB bytes of each frame.
+    """
+    import numpy as np # pylint: disable=import-error
+    frames = 1 if effect == "solid" else max(1, round(fps * period))
+    levels = np.broadcast_to(brightness(effect, frames, led_count), (frames, led_count))
+    cycle = np.rint(levels[:, :, None] * np.asarray(color, dtype=np.float32)).astype(np.uint8).reshape(frames, led_count * 3)
+    cycle.flags.writeable = False
+    return cycle
+
+class EffectStreamer():
+    """
+    Background thread playing a frame cycle in a loop at a fixed frame rate.
+    Frames are scheduled against absolute deadlines, so timing errors do not accumulate,
+    and frames that could not be sent in time are skipped rather than played late.
+    :param self
+    :param send: Function sending the RGB bytes of one frame, returning whether it was sent.
+    :type send: callable
+    :param fps: The frame rate.
+    :type fps: int
+    :param clock: Function returning the current time in seconds.
+    :type clock: callable
+    :return: None
+    """
+    def __init__(self, send, fps: int = DEFAULT_FPS, clock=time.monotonic):
+        self.send = send
+        self.fps = fps
+        self.clock = clock
+        self.frames = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.sent = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def play(self, frames):
+        """
+        Start looping a frame cycle, replacing the cycle being played.
+        :param self
+        :param frames: The frame cycle, as returned by frame_cycle.
+        :type frames: numpy.ndarray
+        :return: None
+        """
+        self.frames = frames
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="EffectStreamer", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """
+        Stop playing and wait for the streaming thread to exit.
+        :param self
+        :return: None
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def _run(self):
+        """
+        Streaming thread body.
+        :param self
+        :return: None
+        """
+        interval = 1 / self.fps
+        deadline = self.clock()
+        index = 0
+        while not self.stop_event.is_set():
+            frames = self.frames
+            if self.send(frames[index % len(frames)].tobytes()):
+                self.sent += 1
+            else:
+                self.errors += 1
+            index += 1
+            deadline += interval
+            delay = deadline - self.clock()
+            if delay < 0:
+                missed = int(-delay / interval) + 1
+                self.skipped += missed
+                index += missed
+                deadline += missed * interval
+                delay += missed * interval
+            self.stop_event.wait(delay)
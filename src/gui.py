@@ -4,14 +4,13 @@ Author: Michelfrancis Bustillos
 """
 # pylint: disable=line-too-long
 # pylint: disable=unnecessary-lambda
+# pylint: disable=import-outside-toplevel
 import tkinter as tk
 from tkinter import ttk, colorchooser
-import pystray
-from PIL import Image
 import config_handler
+import notifications
 from config_handler import save_config, generate_default_config
-from light_handler import update_status, light_communications_check
-from teams_handler import extract_status
+from light_handler import add_status_handler, update_status, start_log_watcher, stop_log_watcher
 
 class GUI():
     """
@@ -24,11 +23,20 @@ class GUI():
     def __init__(self, root: tk.Tk):
         self.root = root
         self.root.title("Teams Status Light")
+        self.icon = None
+        self.tray_status = "Unknown"
         self.tray_minimize = tk.BooleanVar()
         self.tray_minimize.set(config_handler.LOADED_CONFIG["tray_minimize"])
         self.check_tray_minimize()
         self.root.title("Teams Status Light")
-        self.menu = (pystray.MenuItem("Open", self.show_window), pystray.MenuItem("Exit", self.close_window))
+        self.errors = {}
+        self.banner = tk.Frame(self.root, background="#f8d7da")
+        self.banner_label = tk.Label(self.banner, background="#f8d7da", foreground="#721c24", justify="left", anchor="w", wraplength=600)
+        self.banner_label.pack(side="left", fill="x", expand=1, padx=10, pady=5)
+        tk.Button(self.banner, text="Dismiss", command=lambda: self.banner.pack_forget()).pack(side="right", padx=10, pady=5)
+        notifications.add_handler(lambda title, message: self.root.after(0, self.show_error, title, message))
+        notifications.add_alert_handler(self.notify_tray)
+        notifications.add_clear_handler(lambda: self.root.after(0, self.clear_errors))
         self.tab_control = ttk.Notebook(self.root)
         self.generate_status_tab()
         self.busy_button = tk.Button()
@@ -39,6 +47,9 @@ class GUI():
         self.manual_override.set(config_handler.LOADED_CONFIG["manual_override"])
         self.light_ip_input = tk.Entry()
         self.log_path_input = tk.Entry()
+        start_log_watcher(self.root, self.status_label, self.light_status_label)
+        config_handler.STORE.subscribe(self.config_changed)
+        add_status_handler(self.status_shown)
         self.manual_override_check()
         self.generate_control_tab()
         self.generate_settings_tab()
@@ -140,17 +151,72 @@ class GUI():
         :param self
         :return: None
         """
+        import pystray
+        from tray_icons import ICONS
         self.root.withdraw()
-        status = self.status_label.cget("text").split(": ")[1]
-        image = Image.open("icons/icon.png")
-        if "Available" in status:
-            image = Image.open("icons/available.png")
-        elif "Busy" in status:
-            image = Image.open("icons/busy.png")
-        elif "Away" in status:
-            image = Image.open("icons/away.png")
-        self.icon = pystray.Icon("name", image, "Teams Status Light", self.menu)
-        self.icon.run()
+        if self.icon is None:
+            menu = (pystray.MenuItem("Open", self.show_window), pystray.MenuItem("Exit", self.close_window))
+            self.icon = pystray.Icon("name", ICONS.get(self.tray_status), f"Teams Status Light: {self.tray_status}", menu)
+            self.icon.run_detached()
+        else:
+            self.icon.icon = ICONS.get(self.tray_status)
+            self.icon.visible = True
+
+    def status_shown(self, status: str):
+        """
+        Update the tray icon in place with the status shown after an update.
+        
+        :param self
+        :param status: The shown status.
+        :type status: str
+        :return: None
+        """
+        if status == self.tray_status:
+            return
+        self.tray_status = status
+        if self.icon is not None:
+            from tray_icons import ICONS
+            self.icon.icon = ICONS.get(status)
+            self.icon.title = f"Teams Status Light: {status}"
+
+    def show_error(self, title: str, message: str):
+        """
+        Show a new or changed error in the banner above the tabs, without blocking the status update loop.
+        
+        :param self
+        :param title: The error type.
+        :type title: str
+        :param message: The message describing the error.
+        :type message: str
+        :return: None
+        """
+        self.errors[title] = message
+        self.banner_label.config(text="\n".join(f"{error_title}: {error_message}" for error_title, error_message in self.errors.items()))
+        self.banner.pack(fill="x", before=self.tab_control)
+
+    def clear_errors(self):
+        """
+        Hide the error banner once the status updates succeed again.
+        
+        :param self
+        :return: None
+        """
+        self.errors.clear()
+        self.banner.pack_forget()
+
+    def notify_tray(self, title: str, message: str):
+        """
+        Show an error as a tray notification while the window is minimized to the tray.
+        
+        :param self
+        :param title: The error type.
+        :type title: str
+        :param message: The message describing the error.
+        :type message: str
+        :return: None
+        """
+        if self.icon is not None and self.icon.visible and self.icon.HAS_NOTIFICATION:
+            self.icon.notify(message, title)
 
     def show_window(self):
         """
@@ -159,19 +225,22 @@ class GUI():
         :param self
         :return: None
         """
-        self.icon.stop()
+        self.icon.visible = False
         self.root.protocol("WM_DELETE_WINDOW", lambda: self.widthdraw_window())
         self.root.after(0, self.root.deiconify)
 
     def close_window(self):
         """
-        Callback for closing the application from the system tray menu.
+        Callback for closing the application, from the window's close button or the system tray menu.
+        Stops the tray icon thread if the tray icon was ever shown, as it would keep the process running.
         
         :param self
         :return: None
         """
-        self.icon.stop()
-        self.root.destroy()
+        if self.icon is not None:
+            self.icon.stop()
+        stop_log_watcher()
+        self.root.after(0, self.root.destroy)
 
     def check_tray_minimize(self):
         """
@@ -183,7 +252,7 @@ class GUI():
         if self.tray_minimize.get():
             self.root.protocol("WM_DELETE_WINDOW", lambda: self.widthdraw_window())
         else:
-            self.root.protocol("WM_DELETE_WINDOW", lambda: self.root.destroy())
+            self.root.protocol("WM_DELETE_WINDOW", lambda: self.close_window())
         if self.tray_minimize.get() != config_handler.LOADED_CONFIG["tray_minimize"]:
             save_config(None, None, None, self.tray_minimize.get())
 
@@ -196,7 +265,6 @@ class GUI():
         """
         if self.manual_override.get() != config_handler.LOADED_CONFIG["manual_override"]:
             save_config(None, None, None, None, self.manual_override.get())
-        config_handler.LOADED_CONFIG["manual_override"] = self.manual_override.get()
         if not self.manual_override.get():
             update_status(self.root, self.status_label, self.light_status_label, status=None)
             self.busy_button.config(state="disabled")
@@ -233,6 +301,22 @@ class GUI():
         save_config(None, None, None, None, None, self.log_path_input.get())
         update_status(self.root, self.status_label, self.light_status_label, status=None)
 
+    def config_changed(self, changed: set):
+        """
+        Restart the Teams log watcher when the settings it depends on change,
+        and retint the tray icon when a status color changes.
+        
+        :param self
+        :param changed: The changed configuration keys.
+        :type changed: set
+        :return: None
+        """
+        if changed & {"teams_log_path", "watch_debounce_ms"}:
+            start_log_watcher(self.root, self.status_label, self.light_status_label)
+        if changed & {"busy_color", "away_color", "available_color"} and self.icon is not None:
+            from tray_icons import ICONS
+            self.icon.icon = ICONS.get(self.tray_status)
+
     def reset_to_default(self):
         """
         Reset the configuration to default settings.
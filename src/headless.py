@@ -0,0 +1,49 @@
+"""
+Headless status sync loop, keeping the light in line with the Teams status without any GUI.
+Only the light, Teams and configuration handlers are imported,
+so no Tkinter, pystray or PIL is loaded.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import logging
+import signal
+import threading
+import config_handler
+from light_handler import next_update_delay, sync_light
+from log_watcher import LogWatcher
+from teams_handler import invalidate_log_index
+
+STOP_EVENT = threading.Event()
+LOG_CHANGED = threading.Event()
+
+def stop(*_):
+    """
+    Ask the headless loop to stop, usable as a signal handler.
+    :param None
+    :return: None
+    """
+    STOP_EVENT.set()
+    LOG_CHANGED.set()
+
+def run_headless():
+    """
+    Run the status sync loop until stopped, syncing whenever the Teams log changes and as scheduled by the poll scheduler otherwise.
+    Errors are reported through logging instead of dialogs, and unreachable lights keep being retried.
+    :param None
+    :return: None
+    """
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    watcher = LogWatcher(config_handler.LOADED_CONFIG["teams_log_path"], LOG_CHANGED.set, config_handler.LOADED_CONFIG["watch_debounce_ms"] / 1000, rotate_callback=invalidate_log_index)
+    watcher.start()
+    logging.info("Running headless status sync.")
+    try:
+        while not STOP_EVENT.is_set():
+            LOG_CHANGED.clear()
+            light_health, new_status = sync_light()
+            delay = next_update_delay(new_status)
+            logging.debug("Headless sync: status %s, lights %s, next sync in %.1f seconds", new_status, light_health, delay)
+            LOG_CHANGED.wait(delay)
+    finally:
+        watcher.stop()
+        logging.info("Headless status sync stopped.")
@@ -0,0 +1,68 @@
+"""
+This module runs blocking I/O (such as the HTTP requests to the light) on a background thread,
+so that the Tkinter event loop never waits on the network.
+Jobs are keyed, and a job that is still waiting to run is replaced
+when a newer job with the same key arrives.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import logging
+import threading
+
+class IOWorker():
+    """
+    Background worker thread running submitted jobs one at a time, dropping superseded jobs.
+    :param self
+    :param name: The name of the worker thread.
+    :type name: str
+    :return: None
+    """
+    def __init__(self, name: str = "IOWorker"):
+        self.name = name
+        self.condition = threading.Condition()
+        self.pending = {}
+        self.thread = None
+        self.dropped = 0
+
+    def submit(self, key: str, func, args: tuple = (), callback=None):
+        """
+        Queue a job, replacing any job with the same key that has not started yet.
+        :param self
+        :param key: The key identifying which jobs supersede each other.
+        :type key: str
+        :param func: The blocking function to run on the worker thread.
+        :type func: callable
+        :param args: The positional arguments for the function.
+        :type args: tuple
+        :param callback: Function called on the worker thread with the job result (optional).
+        :type callback: callable or None
+        :return: None
+        """
+        with self.condition:
+            if self.pending.pop(key, None) is not None:
+                self.dropped += 1
+                logging.debug("Dropped superseded %s job.", key)
+            self.pending[key] = (func, args, callback)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def _run(self):
+        """
+        Worker thread body, running the oldest pending job until the process exits.
+        :param self
+        :return: None
+        """
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                key = next(iter(self.pending))
+                func, args, callback = self.pending.pop(key)
+            try:
+                result = func(*args)
+                if callback is not None:
+                    callback(result)
+            except Exception as e: # pylint: disable=broad-exception-caught
+                logging.error("Error running %s job: %s", key, e)
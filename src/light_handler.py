@@ -5,13 +5,159 @@ and checking the communication with the light.
 Author: Michelfrancis Bustillos
 """
 # pylint: disable=line-too-long
-import tkinter as tk
-from tkinter import messagebox
+from __future__ import annotations
+from typing import TYPE_CHECKING
 import logging
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from teams_handler import extract_status
+from teams_handler import current_log_path, extract_status, invalidate_log_index, status_changed_at
+from status_history import record_history
+from metrics import span, observe_end_to_end
+from log_watcher import LogWatcher
+from io_worker import IOWorker
+from notifications import clear_errors, report_error
+from scheduler import Backoff, PollScheduler
+from transition_filter import TransitionFilter
+from realtime import UDPTransport
+from effects import EffectStreamer, frame_cycle, numpy_available
 import config_handler
 
+if TYPE_CHECKING:
+    import tkinter as tk
+
+WATCHER = None
+NEXT_TICK = None
+SCHEDULER = None
+TRANSITION_FILTER = None
+WORKER = IOWorker("LightIO")
+EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="Light")
+CLIENTS = {}
+CLIENTS_LOCK = threading.Lock()
+STATUS_HANDLERS = []
+SYNC_HANDLERS = []
+BACKOFF_BASE = 5.0
+BACKOFF_MAX = 300.0
+OFF_COLOR = (0, 0, 0)
+LIVE_OFF = b'{"live":false,'
+
+def get_scheduler() -> PollScheduler:
+    """
+    Return the poll scheduler of the status update loop, creating it from the configuration on first use.
+    :param None
+    :return: PollScheduler: The poll scheduler.
+    """
+    global SCHEDULER
+    if SCHEDULER is None:
+        SCHEDULER = PollScheduler(config_handler.LOADED_CONFIG["poll_min_interval"], config_handler.LOADED_CONFIG["poll_max_interval"], Backoff(BACKOFF_BASE, BACKOFF_MAX))
+    return SCHEDULER
+
+def get_transition_filter() -> TransitionFilter:
+    """
+    Return the filter debouncing automatic status transitions, creating it from the configuration on first use.
+    :param None
+    :return: TransitionFilter: The transition filter.
+    """
+    global TRANSITION_FILTER
+    if TRANSITION_FILTER is None:
+        TRANSITION_FILTER = TransitionFilter(config_handler.LOADED_CONFIG["transition_dwell"], config_handler.LOADED_CONFIG["transition_hysteresis"])
+    return TRANSITION_FILTER
+
+def add_status_handler(handler):
+    """
+    Register a function called on the Tkinter thread with the status shown after every update, such as the tray icon.
+    :param handler: Function taking the shown status ("Error" while an error is shown).
+    :type handler: callable
+    :return: None
+    """
+    STATUS_HANDLERS.append(handler)
+
+def add_sync_handler(handler):
+    """
+    Register a function called on the I/O worker thread after every light sync, such as the push server.
+    :param handler: Function taking the status the lights were set to and the light communication status of each light by name.
+    :type handler: callable
+    :return: None
+    """
+    SYNC_HANDLERS.append(handler)
+
+def config_changed(changed: set):
+    """
+    Recreate the poll scheduler and transition filter when their settings change.
+    :param changed: The changed configuration keys.
+    :type changed: set
+    :return: None
+    """
+    global SCHEDULER, TRANSITION_FILTER
+    if changed & {"poll_min_interval", "poll_max_interval"}:
+        SCHEDULER = None
+    if changed & {"transition_dwell", "transition_hysteresis"}:
+        TRANSITION_FILTER = None
+
+config_handler.STORE.subscribe(config_changed)
+
+def next_update_delay(new_status) -> float:
+    """
+    Record the outcome of an update with the poll scheduler and return the delay until the next update,
+    shortened if a pending status transition is due to settle earlier.
+    While every light is backing off, the next update waits for the earliest light retry instead of backing off again.
+    Only a snapshot of the light clients is read, as this runs on the Tkinter thread while a sync may be rebuilding them.
+    :param new_status: The status found by the update (None if none was extracted).
+    :type new_status: str or None
+    :return: float: The delay in seconds until the next update.
+    """
+    retry_in = min((client.retry_at - client.clock() for client in list(CLIENTS.values())), default=0.0)
+    delay = get_scheduler().record(new_status, not config_handler.ERROR_STATUS, retry_in if retry_in > 0 else None)
+    pending = get_transition_filter().time_to_settle()
+    return delay if pending is None else min(delay, pending)
+
+def start_log_watcher(root: tk.Tk, status_label: tk.Label, light_status_label: tk.Label):
+    """
+    Start (or restart) watching the configured Teams log path, updating the status whenever the log is written.
+    The scheduled status updates then mostly serve as light health checks.
+    :param root: The root Tkinter window.
+    :type root: tk.Tk
+    :param status_label: The Tkinter Label widget to update with the current status.
+    :type status_label: tk.Label
+    :param light_status_label: The Tkinter Label widget to update with the current light status.
+    :type light_status_label: tk.Label
+    :return: None
+    """
+    global WATCHER
+    stop_log_watcher()
+    WATCHER = LogWatcher(config_handler.LOADED_CONFIG["teams_log_path"],
+                         lambda: root.after(0, log_changed, root, status_label, light_status_label),
+                         config_handler.LOADED_CONFIG["watch_debounce_ms"] / 1000,
+                         rotate_callback=invalidate_log_index)
+    WATCHER.start()
+
+def stop_log_watcher():
+    """
+    Stop watching the Teams log path.
+    :param None
+    :return: None
+    """
+    global WATCHER
+    if WATCHER is not None:
+        WATCHER.stop()
+        WATCHER = None
+
+def log_changed(root: tk.Tk, status_label: tk.Label, light_status_label: tk.Label):
+    """
+    Callback for the log watcher, updating the status unless manual override is enabled.
+    :param root: The root Tkinter window.
+    :type root: tk.Tk
+    :param status_label: The Tkinter Label widget to update with the current status.
+    :type status_label: tk.Label
+    :param light_status_label: The Tkinter Label widget to update with the current light status.
+    :type light_status_label: tk.Label
+    :return: None
+    """
+    if config_handler.LOADED_CONFIG["manual_override"] is False:
+        update_status(root, status_label, light_status_label)
+
 def update_status(root: tk.Tk, status_label: tk.Label, light_status_label: tk.Label, status = None):
     """
     Update the status and light status labels in the GUI.
@@ -25,106 +171,418 @@ def update_status(root: tk.Tk, status_label: tk.Label, light_status_label: tk.La
     :type status: str or None 
     :return: None
     """
-    light_communication = light_communications_check()
-    if light_communication == "Connected":
-        if status is not None and status != get_light_status() and config_handler.LOADED_CONFIG["manual_override"] is True:
-            update_light(status)
-            logging.info("Manual override status update: %s", status)
-        if config_handler.LOADED_CONFIG["manual_override"] is False:
-            new_status = extract_status()
-            if new_status != get_light_status():
-                update_light(new_status)
-                logging.info("Automatic status update: %s", new_status)
-                status_label.config(text=f"Current Status: {new_status}")
-    if not config_handler.ERROR_STATUS and config_handler.LOADED_CONFIG["manual_override"] is False:
-        root.after(10000, update_status, root, status_label, light_status_label)
+    global NEXT_TICK
+    if NEXT_TICK is not None:
+        root.after_cancel(NEXT_TICK)
+        NEXT_TICK = None
+    WORKER.submit("light", sync_light, (status,), lambda result: root.after(0, show_status, root, status_label, light_status_label, status, result))
+
+def sync_light(status = None) -> tuple:
+    """
+    Bring the lights in line with the current status. Runs on the I/O worker thread, never on the Tkinter thread.
+    All lights are updated concurrently, so one slow or unreachable light does not delay the others.
+    :param status: The current status to set the lights to (optional, if not provided it will be extracted from the Teams log).
+    :type status: str or None
+    :return: tuple: The light communication status of each light by name ("Connected", "Error" or "Backing off") and the extracted status (None if not extracted).
+    """
+    new_status = None
+    target = None
+    if config_handler.LOADED_CONFIG["manual_override"] is True:
+        target = status
     else:
-        logging.info("Manual override enabled or error status detected, stopping automatic status updates.")
-        if config_handler.LOADED_CONFIG["manual_override"] is True:
-            status_label.config(text=f"Current Status: {status} (Manual Override Enabled)")
+        new_status = target = extract_status()
+        if not new_status.startswith("Error"):
+            if config_handler.LOADED_CONFIG["history_file"]:
+                record_history(config_handler.LOADED_CONFIG["history_file"], current_log_path())
+            new_status = target = get_transition_filter().update(new_status)
+    clients = get_clients()
+    acknowledged = [client.shadow.acknowledged_at for client in clients]
+    results = list(EXECUTOR.map(lambda client: client.sync(target), clients))
+    light_health = {client.name: result for client, result in zip(clients, results)}
+    changed_at = status_changed_at()
+    if new_status is not None and changed_at is not None and any(client.shadow.acknowledged_at != before for client, before in zip(clients, acknowledged)):
+        observe_end_to_end("log_write_to_light", time.time() - changed_at)
+    config_handler.ERROR_STATUS = "Connected" not in results or (new_status is not None and new_status.startswith("Error"))
+    if target is not None:
+        for handler in SYNC_HANDLERS:
+            handler(target, light_health)
+    return light_health, new_status
+
+def format_light_status(light_health: dict) -> str:
+    """
+    Format the light communication status of each light for the status tab.
+    :param light_health: The light communication status of each light by name.
+    :type light_health: dict
+    :return: str: The text for the light status label.
+    """
+    if len(light_health) == 1:
+        return f"Light Status: {next(iter(light_health.values()))}"
+    return "Light Status:\n" + "\n".join(f"{name}: {health}" for name, health in light_health.items())
+
+def show_status(root: tk.Tk, status_label: tk.Label, light_status_label: tk.Label, status, result: tuple):
+    """
+    Show the result of a light sync in the GUI and schedule the next update. Runs on the Tkinter thread.
+    :param root: The root Tkinter window.
+    :type root: tk.Tk
+    :param status_label: The Tkinter Label widget to update with the current status.
+    :type status_label: tk.Label
+    :param light_status_label: The Tkinter Label widget to update with the current light status.
+    :type light_status_label: tk.Label
+    :param status: The status that was requested for the light (None for automatic updates).
+    :type status: str or None
+    :param result: The light communication status of each light and extracted status returned by sync_light.
+    :type result: tuple
+    :return: None
+    """
+    global NEXT_TICK
+    light_health, new_status = result
+    if config_handler.ERROR_STATUS:
+        if "Connected" not in light_health.values() and "Error" in light_health.values():
+            report_error("Light Communication Error", "Error communicating with the light. Please check the light IP address in the settings.")
+        elif new_status is not None and new_status.startswith("Error"):
+            report_error("Teams Logs Not Found", "Error finding Teams log files. Please confirm the teams log path in the settings or open Microsoft Teams at least once to generate log files.")
+    else:
+        clear_errors()
+    if config_handler.LOADED_CONFIG["manual_override"] is False:
+        delay = next_update_delay(new_status)
+        if NEXT_TICK is not None:
+            root.after_cancel(NEXT_TICK)
+        NEXT_TICK = root.after(int(delay * 1000), update_status, root, status_label, light_status_label)
         if config_handler.ERROR_STATUS:
-            status_label.config(text="Error Detected! Please check the light IP address and Teams log path in the settings.")
-    light_status_label.config(text=f"Light Status: {light_communication}")
+            logging.info("Error status detected, retrying in %.1f seconds.", delay)
+            status_label.config(text=f"Error Detected! Please check the light IP address and Teams log path in the settings. Retrying in {delay:.0f} seconds.")
+        elif new_status is not None:
+            status_label.config(text=f"Current Status: {new_status}")
+    else:
+        logging.info("Manual override enabled, stopping automatic status updates.")
+        status_label.config(text=f"Current Status: {status} (Manual Override Enabled)")
+    light_status_label.config(text=format_light_status(light_health))
+    shown = status if config_handler.LOADED_CONFIG["manual_override"] else "Error" if config_handler.ERROR_STATUS else new_status
+    if shown is not None:
+        for handler in STATUS_HANDLERS:
+            handler(shown)
+
+class ShadowState():
+    """
+    Shadow model of the light state: the last payload the light acknowledged and when.
+    The real light is only queried when reconciling, either periodically or after an error,
+    to pick up changes made outside the application.
+    :param self
+    :param reconcile_interval: Seconds after which the shadow state is checked against the light again.
+    :type reconcile_interval: float
+    :param clock: Function returning the current time in seconds.
+    :type clock: callable
+    :return: None
+    """
+    def __init__(self, reconcile_interval: float = 300.0, clock=time.monotonic):
+        self.reconcile_interval = reconcile_interval
+        self.clock = clock
+        self.status = None
+        self.payload = None
+        self.acknowledged_at = None
+        self.reconciled_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def needs_reconcile(self) -> bool:
+        """
+        Check whether the light must be queried, counting the check as a cache miss if so.
+        :param self
+        :return: bool: True if the shadow state is unknown, invalidated or older than the reconcile interval.
+        """
+        if self.reconciled_at is None or self.clock() - self.reconciled_at >= self.reconcile_interval:
+            self.misses += 1
+            return True
+        return False
+
+    def reconcile(self, status: str, payload: bytes):
+        """
+        Replace the shadow state with the status read back from the light.
+        :param self
+        :param status: The status the light currently shows.
+        :type status: str
+        :param payload: The serialized payload matching that status.
+        :type payload: bytes
+        :return: None
+        """
+        self.status = status
+        self.payload = payload
+        self.reconciled_at = self.clock()
 
-def light_communications_check() -> str:
+    def acknowledge(self, status: str, payload: bytes):
+        """
+        Record a payload that the light accepted.
+        :param self
+        :param status: The status that was sent.
+        :type status: str
+        :param payload: The serialized payload that was sent.
+        :type payload: bytes
+        :return: None
+        """
+        self.status = status
+        self.payload = payload
+        self.acknowledged_at = self.clock()
+
+    def invalidate(self):
+        """
+        Forget the shadow state so that the next update reconciles with the light.
+        :param self
+        :return: None
+        """
+        self.status = None
+        self.payload = None
+        self.reconciled_at = None
+
+class LightClient():
+    """
+    HTTP client for a single light, keeping one pooled keep-alive session open for all requests.
+    Each light has its own shadow state and health, backing off exponentially while it is unreachable.
+    Lights configured with a UDP realtime transport get their colors over UDP, animated with the configured effects,
+    falling back to HTTP while UDP fails.
+    :param self
+    :param light: The configuration of the light.
+    :type light: config_handler.LightConfig
+    :param reconcile_interval: Seconds after which the shadow state is checked against the light again.
+    :type reconcile_interval: float
+    :param clock: Function returning the current time in seconds.
+    :type clock: callable
+    :return: None
     """
-    Check if the light is reachable and update the configuration accordingly.
+    def __init__(self, light: config_handler.LightConfig, reconcile_interval: float = 300.0, clock=time.monotonic):
+        self.name = light.name
+        self.url = light.url
+        self.colors = light.colors
+        self.clock = clock
+        self.session = requests.Session()
+        self.session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.trust_env = False
+        self.shadow = ShadowState(reconcile_interval, clock)
+        self.backoff = Backoff(BACKOFF_BASE, BACKOFF_MAX)
+        self.retry_at = 0.0
+        self.transport = None
+        self.streamer = None
+        self.udp_retry_at = 0.0
+        if light.transport != "http":
+            self.transport = UDPTransport(urllib.parse.urlsplit(light.url).hostname, light.transport, light.led_count, light.udp_port)
+
+    def fetch_state(self):
+        """
+        Fetch the current JSON state of the light.
+        :param self
+        :return: dict or None: The light state, or None if the light could not be reached.
+        """
+        with span("fetch_state") as result:
+            try:
+                response = self.session.get(self.url, timeout=5)
+                response.raise_for_status()
+                return response.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                result.fail()
+                logging.error("Error communicating with light %s: %s", self.name, e)
+                return None
+
+    def post_state(self, payload: bytes) -> bool:
+        """
+        Send a new JSON state to the light.
+        :param self
+        :param payload: The serialized WLED JSON state to send.
+        :type payload: bytes
+        :return: bool: True if the light accepted the new state.
+        """
+        with span("update_light") as result:
+            try:
+                response = self.session.post(self.url, data=payload, headers={"Content-Type": "application/json"}, timeout=5)
+                response.raise_for_status()
+                return True
+            except requests.exceptions.RequestException as e:
+                result.fail()
+                logging.error("Error updating light %s status: %s", self.name, e)
+                return False
+
+    def fetch_led_count(self) -> int:
+        """
+        Fetch the number of LEDs of the light from the WLED info API.
+        :param self
+        :return: int: The LED count, or 0 if the light could not be reached.
+        """
+        try:
+            response = self.session.get(self.url.replace("/json/state", "/json/info"), timeout=5)
+            response.raise_for_status()
+            return int(response.json()["leds"]["count"])
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+            logging.error("Error fetching LED count of light %s: %s", self.name, e)
+            return 0
+
+    def push_state(self, status: str, payload: bytes) -> bool:
+        """
+        Send a status to the light over its UDP realtime transport if it has one, and over the JSON API otherwise.
+        When UDP fails, the light is updated over HTTP (leaving realtime mode) until the next reconcile interval.
+        :param self
+        :param status: The status to send.
+        :type status: str
+        :param payload: The serialized WLED JSON state for the status, used over HTTP.
+        :type payload: bytes
+        :return: bool: True if the update was sent successfully.
+        """
+        if self.transport is not None and self.clock() >= self.udp_retry_at:
+            if not self.transport.led_count:
+                self.transport.led_count = self.fetch_led_count()
+            if self.transport.led_count:
+                with span("update_light_udp") as result:
+                    if self.show(status):
+                        return True
+                    result.fail()
+            self.stop_effect()
+            self.udp_retry_at = self.clock() + self.shadow.reconcile_interval
+            logging.warning("Light %s: %s unavailable, using HTTP for the next %.0f seconds.", self.name, self.transport.protocol.upper(), self.shadow.reconcile_interval)
+        if self.transport is not None:
+            payload = LIVE_OFF + payload[1:]
+        return self.post_state(payload)
+
+    def show(self, status: str) -> bool:
+        """
+        Show a status over the UDP realtime transport, streaming its effect or sending a solid color.
+        :param self
+        :param status: The status to show.
+        :type status: str
+        :return: bool: False if sending failed, including any frame of the effect played so far.
+        """
+        color = self.colors.rgb.get(status, OFF_COLOR)
+        effect = config_handler.LOADED_CONFIG.get("effects", {}).get(status, "solid")
+        if self.streamer is not None and self.streamer.errors:
+            self.stop_effect()
+            return False
+        if effect == "solid" or color == OFF_COLOR or not numpy_available():
+            self.stop_effect()
+            return self.transport.send_color(color)
+        fps = config_handler.LOADED_CONFIG.get("effect_fps", 30)
+        if self.streamer is not None and self.streamer.fps != fps:
+            self.stop_effect()
+        if self.streamer is None:
+            self.streamer = EffectStreamer(self.transport.send_frame, fps)
+        self.streamer.play(frame_cycle(effect, color, self.transport.led_count, fps, config_handler.LOADED_CONFIG.get("effect_period", 2.0)))
+        logging.debug("Light %s: playing %s effect for %s.", self.name, effect, status)
+        return True
+
+    def stop_effect(self):
+        """
+        Stop streaming the current effect, if any.
+        :param self
+        :return: None
+        """
+        if self.streamer is not None:
+            self.streamer.stop()
+            self.streamer = None
+
+    def sync(self, status) -> str:
+        """
+        Bring this light in line with a status, reconciling the shadow state with the light when needed.
+        :param self
+        :param status: The status to set the light to, or None to only check the light.
+        :type status: str or None
+        :return: str: The light communication status ("Connected", "Error" or "Backing off").
+        """
+        if self.clock() < self.retry_at:
+            return "Backing off"
+        if self.shadow.needs_reconcile():
+            state = self.fetch_state()
+            if light_communications_check(state) == "Error":
+                return self.failed()
+            if self.transport is None:
+                light_status = get_light_status(state, self.colors)
+                self.shadow.reconcile(light_status, light_payload(light_status, self.colors))
+            else:
+                self.shadow.reconcile(None, None)
+        else:
+            self.shadow.hits += 1
+        if status is not None:
+            payload = light_payload(status, self.colors)
+            if payload != self.shadow.payload:
+                if not self.push_state(status, payload):
+                    return self.failed()
+                self.shadow.acknowledge(status, payload)
+                logging.info("Updated light %s status to %s", self.name, status)
+        logging.debug("Light %s shadow state: %d hits, %d misses.", self.name, self.shadow.hits, self.shadow.misses)
+        self.backoff.reset()
+        return "Connected"
+
+    def failed(self) -> str:
+        """
+        Record a failed request, invalidating the shadow state and backing off before the next attempt.
+        :param self
+        :return: str: The light communication status ("Error").
+        """
+        self.shadow.invalidate()
+        backoff = self.backoff.failure()
+        self.retry_at = self.clock() + backoff
+        logging.info("Light %s unreachable %d time(s), retrying in %.0f seconds.", self.name, self.backoff.failures, backoff)
+        return "Error"
+
+    def close(self):
+        """
+        Close the pooled connections of the session and the UDP socket.
+        :param self
+        :return: None
+        """
+        self.session.close()
+        self.stop_effect()
+        if self.transport is not None:
+            self.transport.close()
+
+def get_clients() -> list:
+    """
+    Return the light clients for the configured lights, keeping the clients (and their state) of unchanged lights.
+    Thread-safe, so that a light client is never created twice for the same light.
     :param None
+    :return: list: The LightClient of each configured light.
+    """
+    global CLIENTS
+    with CLIENTS_LOCK:
+        clients = []
+        for light in config_handler.LOADED_CONFIG["lights"]:
+            key = (light.name, light.url, light.transport, light.led_count, light.udp_port)
+            client = CLIENTS.pop(key, None) or LightClient(light, config_handler.LOADED_CONFIG["reconcile_interval"])
+            client.colors = light.colors
+            clients.append((key, client))
+        for client in CLIENTS.values():
+            client.close()
+        CLIENTS = dict(clients)
+        return list(CLIENTS.values())
+
+def light_communications_check(state) -> str:
+    """
+    Check if the light is reachable.
+    :param state: The light state fetched for this update, or None if fetching it failed.
+    :type state: dict or None
     :return: str: The status of the light communication ("Connected" or "Error").
     """
-    url = config_handler.LOADED_CONFIG["light_url"]
-    try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        return "Connected"
-    except requests.exceptions.RequestException as e:
-        config_handler.ERROR_STATUS = True
-        messagebox.showerror("Light Communication Error", "Error communicating with the light. Please check the light IP address in the settings.")
-        logging.error("Error communicating with light: %s", e)
+    if state is None:
         return "Error"
+    return "Connected"
 
-def update_light(status: str):
+def light_payload(status: str, colors: config_handler.ColorTable = None) -> bytes:
     """
-    Update Light color based on status.
-    :param status: The current status to set the light to ("Available", "Busy", "Away", or "Unknown").
+    Return the pre-serialized light state payload for a status.
+    :param status: The status to get the payload for ("Available", "Busy", "Away", or "Unknown").
     :type status: str
-    :return: None
+    :param colors: The color table of the light (optional, defaults to the configured colors).
+    :type colors: config_handler.ColorTable or None
+    :return: bytes: The WLED JSON state for the status.
     """
-    url = config_handler.LOADED_CONFIG["light_url"]
-    available_r = int(config_handler.LOADED_CONFIG["available_color"].strip("()").split(",")[0])
-    available_g = int(config_handler.LOADED_CONFIG["available_color"].strip("()").split(",")[1])
-    available_b = int(config_handler.LOADED_CONFIG["available_color"].strip("()").split(",")[2])
-    busy_r = int(config_handler.LOADED_CONFIG["busy_color"].strip("()").split(",")[0])
-    busy_g = int(config_handler.LOADED_CONFIG["busy_color"].strip("()").split(",")[1])
-    busy_b = int(config_handler.LOADED_CONFIG["busy_color"].strip("()").split(",")[2])
-    away_r = int(config_handler.LOADED_CONFIG["away_color"].strip("()").split(",")[0])
-    away_g = int(config_handler.LOADED_CONFIG["away_color"].strip("()").split(",")[1])
-    away_b = int(config_handler.LOADED_CONFIG["away_color"].strip("()").split(",")[2])
-    color_map = {
-        "Available": {"on": True, "seg": [{"id": 0, "col": [[available_r,available_g,available_b]]}], "bri": 254},
-        "Busy": {"on": True, "seg": [{"id": 0, "col": [[busy_r,busy_g,busy_b]]}], "bri": 254},
-        "Do not disturb": {"on": True, "seg": [{"id": 0, "col": [[busy_r,busy_g,busy_b]]}], "bri": 254},
-        "Away": {"on": True, "seg": [{"id": 0, "col": [[away_r,away_g,away_b]]}], "bri": 254},
-        "Unknown": {"on": False}
-    }
-    payload = color_map.get(status, color_map["Unknown"])
-    try:
-        response = requests.post(url, json=payload, timeout=5)
-        response.raise_for_status()
-        logging.info("Updated light status to %s", status)
-    except requests.exceptions.RequestException as e:
-        logging.error("Error updating light status: %s", e)
-
-def get_light_status() -> str:
-    """
-    Get the current status of the light.
-    :param None
+    payloads = (colors or config_handler.COLOR_TABLE).payloads
+    return payloads.get(status, payloads["Unknown"])
+
+def get_light_status(state, colors: config_handler.ColorTable = None) -> str:
+    """
+    Get the current status of the light from its state.
+    :param state: The light state fetched for this update, or None if fetching it failed.
+    :type state: dict or None
+    :param colors: The color table of the light (optional, defaults to the configured colors).
+    :type colors: config_handler.ColorTable or None
     :return: str: The current status of the light ("Available", "Busy", "Away", or "Unknown").
     """
-    url = config_handler.LOADED_CONFIG["light_url"]
-    available_r = int(config_handler.LOADED_CONFIG["available_color"].strip("()").split(",")[0])
-    available_g = int(config_handler.LOADED_CONFIG["available_color"].strip("()").split(",")[1])
-    available_b = int(config_handler.LOADED_CONFIG["available_color"].strip("()").split(",")[2])
-    busy_r = int(config_handler.LOADED_CONFIG["busy_color"].strip("()").split(",")[0])
-    busy_g = int(config_handler.LOADED_CONFIG["busy_color"].strip("()").split(",")[1])
-    busy_b = int(config_handler.LOADED_CONFIG["busy_color"].strip("()").split(",")[2])
-    away_r = int(config_handler.LOADED_CONFIG["away_color"].strip("()").split(",")[0])
-    away_g = int(config_handler.LOADED_CONFIG["away_color"].strip("()").split(",")[1])
-    away_b = int(config_handler.LOADED_CONFIG["away_color"].strip("()").split(",")[2])
-    try:
-        response = requests.get(url,timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("on"):
-                col = data.get("seg", [{}])[0].get("col")[0]
-                if col == [available_r,available_g,available_b]:
-                    return "Available"
-                elif col == [busy_r,busy_g,busy_b]:
-                    return "Busy"
-                elif col == [away_r,away_g,away_b]:
-                    return "Away"
-                else:
-                    return "Unknown"
-    except requests.exceptions.RequestException as e:
-        logging.error("Error getting light status: %s", e)
+    if state and state.get("on"):
+        col = state.get("seg", [{}])[0].get("col", [None])[0]
+        if isinstance(col, list):
+            return (colors or config_handler.COLOR_TABLE).by_color.get(tuple(col), "Unknown")
     return "Unknown"
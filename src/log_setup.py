@@ -0,0 +1,130 @@
+"""
+This module sets up application logging so that no thread ever waits on the disk to log:
+every logger hands its records to a queue,
+and a single background listener thread writes them to a size-rotated file.
+On a fast local disk this costs about as much as writing directly; it pays off when writes are slow,
+e.g. on a busy disk, a synced or network home folder or with antivirus scans.
+Log levels can be set per logger in the configuration,
+e.g. to keep urllib3 from logging every connection.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import config_handler
+
+LOG_FORMAT = "%(asctime)s %(levelname)s: %(message)s"
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+DEFAULT_LEVELS = "urllib3=WARNING, PIL=INFO"
+QUEUE = queue.SimpleQueue()
+LISTENER = None
+MODULE_LEVELS = {}
+
+def parse_levels(text: str) -> dict:
+    """
+    Parse per-logger levels from the configuration.
+    :param text: Comma separated logger=LEVEL pairs, e.g. "urllib3=WARNING, PIL=INFO".
+    :type text: str
+    :return: dict: The level of each logger by name.
+    :raises ValueError: If a pair is malformed or a level is unknown.
+    """
+    levels = {}
+    for pair in text.split(","):
+        if not pair.strip():
+            continue
+        name, separator, level = pair.partition("=")
+        level = level.strip().upper()
+        if not separator or not name.strip() or not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Invalid log level setting: {pair.strip()!r}, expected logger=LEVEL.")
+        levels[name.strip()] = level
+    return levels
+
+def set_levels(level: str, levels: dict):
+    """
+    Set the root log level and the level of each listed logger, resetting loggers no longer listed.
+    :param level: The root log level, e.g. "DEBUG".
+    :type level: str
+    :param levels: The level of each logger by name.
+    :type levels: dict
+    :return: None
+    """
+    logging.getLogger().setLevel(level)
+    for name in MODULE_LEVELS.keys() - levels.keys():
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+    MODULE_LEVELS.clear()
+    MODULE_LEVELS.update(levels)
+
+def start_logging(path: str = "debug.log", level: str = "DEBUG", max_bytes: int = DEFAULT_MAX_BYTES, backup_count: int = DEFAULT_BACKUP_COUNT, levels: dict = None):
+    """
+    Route all logging through the queue and (re)start the listener writing it to a rotating file.
+    Records logged while the listener is restarted wait in the queue, so nothing is lost when the settings change.
+    The previous log file is rotated out on the first start, so each run starts with a fresh file.
+    :param path: The log file.
+    :type path: str
+    :param level: The root log level.
+    :type level: str
+    :param max_bytes: The size at which the log file is rotated (0 = never).
+    :type max_bytes: int
+    :param backup_count: The number of rotated log files kept.
+    :type backup_count: int
+    :param levels: The level of each logger by name (optional, defaults to DEFAULT_LEVELS).
+    :type levels: dict or None
+    :return: logging.handlers.QueueListener: The running listener.
+    """
+    global LISTENER
+    root = logging.getLogger()
+    first_start = LISTENER is None
+    if first_start:
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+        root.addHandler(logging.handlers.QueueHandler(QUEUE))
+        atexit.register(stop_logging)
+    else:
+        stop_logging()
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    if first_start and backup_count and os.path.exists(path) and os.path.getsize(path):
+        file_handler.doRollover()
+    set_levels(level, parse_levels(DEFAULT_LEVELS) if levels is None else levels)
+    LISTENER = logging.handlers.QueueListener(QUEUE, file_handler)
+    LISTENER.start()
+    return LISTENER
+
+def stop_logging():
+    """
+    Write out the queued records and stop the listener.
+    :param None
+    :return: None
+    """
+    if LISTENER is not None and LISTENER._thread is not None: # pylint: disable=protected-access
+        LISTENER.stop()
+        for handler in LISTENER.handlers:
+            handler.close()
+
+def configure_logging(config: dict):
+    """
+    Apply the logging settings of the loaded configuration.
+    :param config: The loaded configuration.
+    :type config: dict
+    :return: None
+    """
+    start_logging(config["log_file"], config["log_level"], config["log_max_bytes"], config["log_backup_count"], config["log_levels"])
+
+def config_changed(changed: set):
+    """
+    Apply changed logging settings: levels take effect immediately, file settings restart the listener.
+    :param changed: The changed configuration keys.
+    :type changed: set
+    :return: None
+    """
+    if changed & {"log_file", "log_max_bytes", "log_backup_count"}:
+        configure_logging(config_handler.LOADED_CONFIG)
+    elif changed & {"log_level", "log_levels"}:
+        set_levels(config_handler.LOADED_CONFIG["log_level"], config_handler.LOADED_CONFIG["log_levels"])
@@ -0,0 +1,242 @@
+"""
+This module watches the Teams log directory for changes,
+so that the status is only extracted when a log file is written or a new log file appears.
+It uses inotify on Linux and falls back to polling file stats everywhere else.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import ctypes
+import ctypes.util
+import fnmatch
+import glob
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+POLL_INTERVAL = 1.0
+
+def _load_inotify():
+    """
+    Load the inotify functions from libc.
+    :param None
+    :return: ctypes.CDLL or None: The libc handle, or None if inotify is not available on this platform.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError) as e:
+        logging.info("inotify not available, falling back to polling: %s", e)
+        return None
+
+class LogWatcher():
+    """
+    Watch the directories matching a Teams log path pattern and call back when a matching log file changes.
+    Bursts of changes within the debounce window are coalesced into a single callback.
+    :param self
+    :param pattern: The Teams log path glob pattern (e.g. ".../Logs/MSTeams_*.log").
+    :type pattern: str
+    :param callback: Function called from the watcher thread when a matching log file was written or created.
+    :type callback: callable
+    :param debounce: Seconds to wait after the first change before calling back, coalescing further changes.
+    :type debounce: float
+    :param use_inotify: Whether to use inotify when it is available (False forces the polling backend).
+    :type use_inotify: bool
+    :param rotate_callback: Function called from the watcher thread, before the callback, when a matching log file was created or renamed (optional).
+    :type rotate_callback: callable or None
+    :return: None
+    """
+    def __init__(self, pattern: str, callback, debounce: float = 0.25, use_inotify: bool = True, rotate_callback=None):
+        self.pattern = pattern
+        self.file_pattern = os.path.basename(pattern)
+        self.callback = callback
+        self.rotate_callback = rotate_callback
+        self.debounce = debounce
+        self.libc = _load_inotify() if use_inotify else None
+        self.backend = "inotify" if self.libc else "polling"
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        Start the watcher thread.
+        :param self
+        :return: None
+        """
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="LogWatcher", daemon=True)
+        self.thread.start()
+        logging.info("Watching Teams logs with %s backend: %s", self.backend, self.pattern)
+
+    def stop(self):
+        """
+        Stop the watcher thread and wait for it to exit.
+        :param self
+        :return: None
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def _run(self):
+        """
+        Watcher thread body, restarting the backend whenever the watched directories go away.
+        :param self
+        :return: None
+        """
+        while not self.stop_event.is_set():
+            try:
+                if self.libc:
+                    self._run_inotify()
+                else:
+                    self._run_polling()
+            except OSError as e:
+                logging.error("Error watching Teams logs: %s", e)
+                self.stop_event.wait(POLL_INTERVAL)
+
+    def _fire(self, fd: int = None, rotated: bool = False):
+        """
+        Wait out the debounce window and call back once for every change seen within it.
+        :param self
+        :param fd: The inotify file descriptor whose queued events are covered by this callback (optional).
+        :type fd: int or None
+        :param rotated: Whether a matching log file was created or renamed.
+        :type rotated: bool
+        :return: None
+        """
+        if self.stop_event.wait(self.debounce):
+            return
+        if fd is not None:
+            rotated = self._drain(fd) or rotated
+        try:
+            if rotated and self.rotate_callback is not None:
+                self.rotate_callback()
+            self.callback()
+        except Exception as e: # pylint: disable=broad-exception-caught
+            logging.error("Error in Teams log watcher callback: %s", e)
+
+    def _run_inotify(self):
+        """
+        Block on inotify events for the log directories until stopped or a directory is removed.
+        :param self
+        :return: None
+        """
+        directories = glob.glob(os.path.dirname(self.pattern))
+        if not directories:
+            self.stop_event.wait(POLL_INTERVAL)
+            return
+        fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            for directory in directories:
+                if self.libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+                    raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            while not self.stop_event.is_set():
+                ready, _, _ = select.select([fd], [], [], POLL_INTERVAL)
+                if not ready:
+                    continue
+                changed, rotated, gone = self._read_events(fd)
+                if changed:
+                    self._fire(fd, rotated)
+                if gone:
+                    return
+        finally:
+            os.close(fd)
+
+    def _read_events(self, fd: int) -> tuple:
+        """
+        Read the pending inotify events.
+        :param self
+        :param fd: The inotify file descriptor.
+        :type fd: int
+        :return: tuple: (bool, bool, bool) whether a matching log file changed, whether one was created or renamed, and whether a watched directory went away.
+        """
+        changed = rotated = gone = False
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return changed, rotated, gone
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                gone = True
+            elif fnmatch.fnmatch(os.fsdecode(name), self.file_pattern):
+                changed = True
+                rotated = rotated or bool(mask & (IN_CREATE | IN_MOVED_TO))
+        return changed, rotated, gone
+
+    def _drain(self, fd: int) -> bool:
+        """
+        Consume events queued during the debounce window; they are covered by the upcoming callback.
+        :param self
+        :param fd: The inotify file descriptor.
+        :type fd: int
+        :return: bool: Whether a matching log file was created or renamed within the window.
+        """
+        rotated = False
+        while True:
+            changed, new_rotated, _ = self._read_events(fd)
+            rotated = rotated or new_rotated
+            if not changed and not new_rotated:
+                return rotated
+
+    def _snapshot(self, files: list) -> tuple:
+        """
+        Collect the modification signature of the log directories and the known log files.
+        :param self
+        :param files: The log files found at the last directory listing.
+        :type files: list
+        :return: tuple: The directory signature and the file signature.
+        """
+        directories = []
+        for directory in glob.glob(os.path.dirname(self.pattern)):
+            directories.append((directory, os.stat(directory).st_mtime_ns))
+        signatures = []
+        for logfile in files:
+            try:
+                stat = os.stat(logfile)
+                signatures.append((logfile, stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                signatures.append((logfile, None, None))
+        return tuple(directories), tuple(signatures)
+
+    def _run_polling(self):
+        """
+        Poll the stats of the log directories and log files until stopped.
+        Directories are only listed again when their modification time changes.
+        :param self
+        :return: None
+        """
+        files = glob.glob(self.pattern)
+        directories, signatures = self._snapshot(files)
+        while not self.stop_event.wait(POLL_INTERVAL):
+            new_directories, new_signatures = self._snapshot(files)
+            rotated = False
+            if new_directories != directories:
+                new_files = glob.glob(self.pattern)
+                rotated = sorted(new_files) != sorted(files)
+                files = new_files
+                new_directories, new_signatures = self._snapshot(files)
+            if new_signatures != signatures:
+                self._fire(rotated=rotated)
+                new_directories, new_signatures = self._snapshot(files)
+            directories, signatures = new_directories, new_signatures
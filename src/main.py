@@ -1,34 +1,73 @@
 """
 Update Light color based on status and display current status in a GUI.
+Run with --headless to sync the light without loading any GUI libraries,
+with --office to sync the lights of every configured user without a GUI,
+or with --history to print the time spent in each status today.
 Author: Michelfrancis Bustillos
 """
+# pylint: disable=line-too-long
+# pylint: disable=import-outside-toplevel
+import argparse
 import os
-import sys
-import tkinter as tk
 import logging
-from gui import GUI
+import config_handler
+import log_setup
+import metrics
 from config_handler import generate_default_config, load_config, save_config
 
-logging.basicConfig(filename="debug.log",
-                    format='%(asctime)s %(levelname)s: %(message)s',
-                    filemode='w')
-
-logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
+log_setup.start_logging()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synchronize the Microsoft Teams status with an RGB light.")
+    parser.add_argument("light_ip", nargs="?", help="IP address of the light to save in the configuration.")
+    parser.add_argument("--headless", action="store_true", help="Run the status sync without a GUI.")
+    parser.add_argument("--office", action="store_true", help="Sync the lights of every [User <name>] in the configuration without a GUI.")
+    parser.add_argument("--history", action="store_true", help="Print the time spent in each status today and exit.")
+    args = parser.parse_args()
     logging.info("Starting application.")
     if not os.path.exists("config.ini"):
         logging.info("Config file not found. Generating default config.")
         generate_default_config()
 
-    if len(sys.argv) > 1:
-        if sys.argv[1]:
-            LIGHT_IP = sys.argv[1]
-            save_config(LIGHT_IP, None, None)
-            logging.info("Light IP address updated from command line argument: %s", LIGHT_IP)
     load_config()
+    log_setup.configure_logging(config_handler.LOADED_CONFIG)
+    config_handler.STORE.subscribe(log_setup.config_changed)
+    if args.light_ip:
+        LIGHT_IP = args.light_ip
+        save_config(LIGHT_IP, None, None)
+        logging.info("Light IP address updated from command line argument: %s", LIGHT_IP)
+    if args.history and not config_handler.LOADED_CONFIG["history_file"]:
+        print("Status history is disabled in the configuration.")
+        raise SystemExit(1)
+    if args.history:
+        from status_history import StatusHistory, today_summary
+        from teams_handler import get_log_index
+        history = StatusHistory(config_handler.LOADED_CONFIG["history_file"], read_only=True)
+        if get_log_index().latest() is not None:
+            history.update(get_log_index().latest())
+        print(today_summary(history))
+        raise SystemExit(0)
+    if args.office and not config_handler.LOADED_CONFIG["users"]:
+        print("No [User <name>] sections in the configuration.")
+        raise SystemExit(1)
+    if config_handler.LOADED_CONFIG["metrics_port"]:
+        metrics.start_server(config_handler.LOADED_CONFIG["metrics_port"])
+    if config_handler.LOADED_CONFIG["metrics_summary_interval"]:
+        metrics.start_summary(config_handler.LOADED_CONFIG["metrics_summary_interval"])
+    if config_handler.LOADED_CONFIG["push_port"] and not args.office:
+        from light_handler import add_sync_handler
+        from push_server import start_server
+        add_sync_handler(start_server(config_handler.LOADED_CONFIG["push_host"], config_handler.LOADED_CONFIG["push_port"]).publish)
 
-    root = tk.Tk()
-    GUI(root)
-    root.mainloop()
+    if args.office:
+        from office import run_office
+        run_office()
+    elif args.headless:
+        from headless import run_headless
+        run_headless()
+    else:
+        import tkinter as tk
+        from gui import GUI
+        root = tk.Tk()
+        GUI(root)
+        root.mainloop()
@@ -0,0 +1,269 @@
+"""
+This module records timing spans and counters for the status sync hot path,
+exposes them in Prometheus text format on an optional local HTTP endpoint
+and periodically writes a summary to the log.
+Recording a span costs two clock reads and a short locked update, so it is left on in production.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SPAN_METRIC = "statuslight_span_seconds"
+END_TO_END_METRIC = "statuslight_log_to_light_seconds"
+HELP = {SPAN_METRIC: "Latency of instrumented status sync operations.",
+        END_TO_END_METRIC: "Latency from the Teams log write to the light accepting the new status."}
+
+class Histogram():
+    """
+    Latency histogram with fixed buckets and success/error counters.
+    :param self
+    :return: None
+    """
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, seconds: float, success: bool = True):
+        """
+        Record one observation.
+        :param self
+        :param seconds: The observed latency in seconds.
+        :type seconds: float
+        :param success: Whether the observed operation succeeded.
+        :type success: bool
+        :return: None
+        """
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        if not success:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in.
+        :param self
+        :param q: The quantile to estimate, from 0 to 1.
+        :type q: float
+        :return: float: The estimated quantile in seconds (infinity if it falls past the last bucket).
+        """
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return float("inf")
+
+class Registry():
+    """
+    Thread-safe collection of histograms, keyed by metric name and span name, and of event counters.
+    :param self
+    :return: None
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def increment(self, event: str, amount: int = 1):
+        """
+        Increment an event counter, creating it on first use.
+        :param self
+        :param event: The event name.
+        :type event: str
+        :param amount: The amount to add.
+        :type amount: int
+        :return: None
+        """
+        with self.lock:
+            self.counters[event] = self.counters.get(event, 0) + amount
+
+    def observe(self, metric: str, name: str, seconds: float, success: bool = True):
+        """
+        Record one observation in a histogram, creating it on first use.
+        :param self
+        :param metric: The metric name.
+        :type metric: str
+        :param name: The span name.
+        :type name: str
+        :param seconds: The observed latency in seconds.
+        :type seconds: float
+        :param success: Whether the observed operation succeeded.
+        :type success: bool
+        :return: None
+        """
+        with self.lock:
+            histogram = self.histograms.get((metric, name))
+            if histogram is None:
+                histogram = self.histograms[(metric, name)] = Histogram()
+            histogram.observe(seconds, success)
+
+    def render(self) -> str:
+        """
+        Render all histograms and counters in the Prometheus text exposition format.
+        :param self
+        :return: str: The metrics text.
+        """
+        lines = []
+        with self.lock:
+            for metric in (SPAN_METRIC, END_TO_END_METRIC):
+                entries = sorted((name, histogram) for (key, name), histogram in self.histograms.items() if key == metric)
+                if not entries:
+                    continue
+                lines.append(f"# HELP {metric} {HELP[metric]}")
+                lines.append(f"# TYPE {metric} histogram")
+                for name, histogram in entries:
+                    total = 0
+                    for bound, count in zip(BUCKETS, histogram.counts):
+                        total += count
+                        lines.append(f'{metric}_bucket{{span="{name}",le="{bound}"}} {total}')
+                    lines.append(f'{metric}_bucket{{span="{name}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{span="{name}"}} {histogram.sum:.6f}')
+                    lines.append(f'{metric}_count{{span="{name}"}} {histogram.count}')
+            spans = sorted((name, histogram) for (key, name), histogram in self.histograms.items() if key == SPAN_METRIC)
+            if spans:
+                lines.append("# HELP statuslight_span_total Outcome of instrumented status sync operations.")
+                lines.append("# TYPE statuslight_span_total counter")
+                for name, histogram in spans:
+                    lines.append(f'statuslight_span_total{{span="{name}",result="success"}} {histogram.count - histogram.errors}')
+                    lines.append(f'statuslight_span_total{{span="{name}",result="error"}} {histogram.errors}')
+            if self.counters:
+                lines.append("# HELP statuslight_events_total Count of notable status sync events.")
+                lines.append("# TYPE statuslight_events_total counter")
+                for event, count in sorted(self.counters.items()):
+                    lines.append(f'statuslight_events_total{{event="{event}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """
+        Summarize all histograms and counters in one line for the log.
+        :param self
+        :return: str: The count, error count, mean and estimated p95 of each span, and the event counters.
+        """
+        with self.lock:
+            parts = [f"{name}: n={histogram.count} errors={histogram.errors} mean={histogram.sum / histogram.count * 1000:.1f}ms p95<={histogram.quantile(0.95) * 1000:.1f}ms"
+                     for (_, name), histogram in sorted(self.histograms.items()) if histogram.count]
+            parts.extend(f"{event}={count}" for event, count in sorted(self.counters.items()))
+            return "; ".join(parts)
+
+REGISTRY = Registry()
+
+class SpanResult():
+    """
+    Outcome of a span, which the instrumented code marks as failed when it handles an error itself.
+    :param self
+    :return: None
+    """
+    def __init__(self):
+        self.success = True
+
+    def fail(self):
+        """
+        Mark the span as failed.
+        :param self
+        :return: None
+        """
+        self.success = False
+
+@contextmanager
+def span(name: str):
+    """
+    Time a block of code and record it under the given span name; exceptions count as errors.
+    :param name: The span name.
+    :type name: str
+    :return: SpanResult: The span outcome, to be marked as failed by the block if needed.
+    """
+    result = SpanResult()
+    start = time.perf_counter()
+    try:
+        yield result
+    except BaseException:
+        result.fail()
+        raise
+    finally:
+        REGISTRY.observe(SPAN_METRIC, name, time.perf_counter() - start, result.success)
+
+def observe_end_to_end(name: str, seconds: float):
+    """
+    Record an end-to-end latency, such as from the Teams log write to the light update.
+    :param name: The name of the measured path.
+    :type name: str
+    :param seconds: The observed latency in seconds.
+    :type seconds: float
+    :return: None
+    """
+    REGISTRY.observe(END_TO_END_METRIC, name, max(seconds, 0.0))
+
+def increment(event: str, amount: int = 1):
+    """
+    Increment an event counter, such as the number of suppressed status transitions.
+    :param event: The event name.
+    :type event: str
+    :param amount: The amount to add.
+    :type amount: int
+    :return: None
+    """
+    REGISTRY.increment(event, amount)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving the metrics in Prometheus text format on /metrics.
+    :param self
+    :return: None
+    """
+    def do_GET(self): # pylint: disable=invalid-name
+        """
+        Serve the metrics.
+        :param self
+        :return: None
+        """
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args): # pylint: disable=redefined-builtin
+        logging.debug("Metrics request: " + format, *args)
+
+def start_server(port: int) -> ThreadingHTTPServer:
+    """
+    Serve the metrics on localhost from a background thread.
+    :param port: The local port to listen on.
+    :type port: int
+    :return: ThreadingHTTPServer: The running server.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="Metrics", daemon=True).start()
+    logging.info("Serving metrics on http://127.0.0.1:%d/metrics", server.server_address[1])
+    return server
+
+def start_summary(interval: float) -> threading.Event:
+    """
+    Write a summary of the metrics to the log periodically from a background thread.
+    :param interval: Seconds between two summaries.
+    :type interval: float
+    :return: threading.Event: Event to set to stop the summaries.
+    """
+    stop_event = threading.Event()
+    def run():
+        while not stop_event.wait(interval):
+            summary = REGISTRY.summary()
+            if summary:
+                logging.info("Metrics summary: %s", summary)
+    threading.Thread(target=run, name="MetricsSummary", daemon=True).start()
+    return stop_event
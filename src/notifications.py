@@ -0,0 +1,144 @@
+"""
+This module routes error notifications from the status sync to whoever is listening,
+so that the light and Teams handlers never depend on a GUI toolkit and never wait on the user.
+Errors are always logged; the GUI registers handlers to show them in a banner
+and as tray notifications. Each error type is reported once while it lasts,
+and alerts for the same error type are rate-limited,
+so a failing sync loop retrying in the background does not flood the user or the log.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import logging
+import threading
+import time
+
+ALERT_INTERVAL = 300.0
+HANDLERS = []
+ALERT_HANDLERS = []
+CLEAR_HANDLERS = []
+
+class ErrorTracker():
+    """
+    Track the active errors by type (title) and decide which reports are new and which may alert the user.
+    :param self
+    :param alert_interval: Minimum seconds between two alerts for the same error type.
+    :type alert_interval: float
+    :param clock: Function returning the current time in seconds.
+    :type clock: callable
+    :return: None
+    """
+    def __init__(self, alert_interval: float = ALERT_INTERVAL, clock=time.monotonic):
+        self.alert_interval = alert_interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.active = {}
+        self.alerted_at = {}
+        self.repeats = {}
+
+    def report(self, title: str, message: str) -> tuple:
+        """
+        Record a reported error.
+        :param self
+        :param title: The error type.
+        :type title: str
+        :param message: The message describing the error.
+        :type message: str
+        :return: tuple: Whether the error is new or changed, and whether the user may be alerted about it.
+        """
+        with self.lock:
+            if self.active.get(title) == message:
+                self.repeats[title] = self.repeats.get(title, 0) + 1
+                return False, False
+            self.active[title] = message
+            now = self.clock()
+            alert = now - self.alerted_at.get(title, float("-inf")) >= self.alert_interval
+            if alert:
+                self.alerted_at[title] = now
+            return True, alert
+
+    def clear(self) -> dict:
+        """
+        Forget the active errors, e.g. once the sync succeeded again. Alert rate limits are kept.
+        :param self
+        :return: dict: The number of repeated reports of each cleared error.
+        """
+        with self.lock:
+            repeats = {title: self.repeats.get(title, 0) for title in self.active}
+            self.active.clear()
+            self.repeats.clear()
+            return repeats
+
+TRACKER = ErrorTracker()
+
+def add_handler(handler):
+    """
+    Register a function to be called with the title and message of every new or changed error, such as an in-window banner.
+    :param handler: The function to call, taking the error title and message.
+    :type handler: callable
+    :return: None
+    """
+    if handler not in HANDLERS:
+        HANDLERS.append(handler)
+
+def remove_handler(handler):
+    """
+    Unregister a previously registered error handler.
+    :param handler: The function to unregister.
+    :type handler: callable
+    :return: None
+    """
+    if handler in HANDLERS:
+        HANDLERS.remove(handler)
+
+def add_alert_handler(handler):
+    """
+    Register a function to be called with the title and message of new errors at most once per ALERT_INTERVAL per error type, such as a tray notification.
+    :param handler: The function to call, taking the error title and message.
+    :type handler: callable
+    :return: None
+    """
+    if handler not in ALERT_HANDLERS:
+        ALERT_HANDLERS.append(handler)
+
+def add_clear_handler(handler):
+    """
+    Register a function to be called when the active errors are resolved.
+    :param handler: The function to call, without arguments.
+    :type handler: callable
+    :return: None
+    """
+    if handler not in CLEAR_HANDLERS:
+        CLEAR_HANDLERS.append(handler)
+
+def report_error(title: str, message: str):
+    """
+    Log an error and pass it on to the registered handlers if it is new. Never blocks on the handlers' user interface.
+    :param title: The short title of the error, identifying its type.
+    :type title: str
+    :param message: The message describing the error and how to fix it.
+    :type message: str
+    :return: None
+    """
+    new, alert = TRACKER.report(title, message)
+    if not new:
+        logging.debug("%s (still failing): %s", title, message)
+        return
+    logging.error("%s: %s", title, message)
+    for handler in HANDLERS:
+        handler(title, message)
+    if alert:
+        for handler in ALERT_HANDLERS:
+            handler(title, message)
+
+def clear_errors():
+    """
+    Mark the active errors as resolved and tell the registered clear handlers.
+    :param None
+    :return: None
+    """
+    repeats = TRACKER.clear()
+    if not repeats:
+        return
+    logging.info("Resolved: %s", ", ".join(f"{title} ({count} repeated reports)" for title, count in repeats.items()))
+    for handler in CLEAR_HANDLERS:
+        handler()
@@ -0,0 +1,275 @@
+"""
+Office mode: one headless process following many users' Teams logs and driving each user's lights,
+as configured in the [User <name>] sections.
+Every user has its own log index, log tailer, transition filter and light clients,
+so statuses never leak between users.
+A single scheduler thread checks the logs for changes and hands the users that need a sync
+to a bounded worker pool; a user is never synced by two workers at once,
+and a slow user only occupies one worker.
+Users with several lights update them concurrently
+on a separate, bounded light pool of the office service.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import config_handler
+from light_handler import LightClient
+from metrics import observe_end_to_end
+from teams_handler import LogIndex, LogTailer
+from transition_filter import TransitionFilter
+
+NO_LOG_STATUS = "Error: No Teams log files found."
+
+class UserSync():
+    """
+    Status sync of a single user: the user's Teams log is followed and the settled status is sent to the user's lights.
+    Not thread-safe; the office service runs at most one sync of a user at a time.
+    :param self
+    :param user: The configuration of the user.
+    :type user: config_handler.UserConfig
+    :param reconcile_interval: Seconds after which the shadow state of each light is checked against the light again.
+    :type reconcile_interval: float
+    :param dwell: Seconds a new status must be seen continuously before it is sent to the lights.
+    :type dwell: float
+    :param hysteresis: Seconds a status is held on the lights before it may change again.
+    :type hysteresis: float
+    :param clock: Function returning the current time in seconds.
+    :type clock: callable
+    :return: None
+    """
+    def __init__(self, user: config_handler.UserConfig, reconcile_interval: float = 300.0, dwell: float = 0.0, hysteresis: float = 0.0, clock=time.monotonic):
+        self.name = user.name
+        self.index = LogIndex(user.teams_log_path)
+        self.tailer = LogTailer()
+        self.transition_filter = TransitionFilter(dwell, hysteresis, clock)
+        self.clients = [LightClient(light, reconcile_interval, clock) for light in user.lights]
+        self.signature = None
+        self.status = "Unknown"
+        self.light_health = {}
+        self.due_at = 0.0
+        self.syncs = 0
+
+    def log_signature(self):
+        """
+        Identify the current content of the user's newest Teams log cheaply, without reading it.
+        :param self
+        :return: tuple or None: The path, size and modification time of the newest log file, or None if there is none.
+        """
+        try:
+            logfile = self.index.latest()
+            if logfile is None:
+                return None
+            stat = os.stat(logfile)
+        except OSError:
+            self.index.invalidate()
+            return None
+        return logfile, stat.st_size, stat.st_mtime_ns
+
+    def read_status(self) -> str:
+        """
+        Read the latest status from the user's newest Teams log, following log rotations.
+        :param self
+        :return: str: The latest status, or NO_LOG_STATUS if the user has no readable log file.
+        """
+        logfile = self.index.latest()
+        if logfile is None:
+            return NO_LOG_STATUS
+        try:
+            if self.tailer.path is not None and logfile != self.tailer.path:
+                self.tailer.rotate(logfile)
+            return self.tailer.read_status(logfile)
+        except OSError as e:
+            logging.debug("User %s: error reading %s: %s", self.name, logfile, e)
+            self.index.invalidate()
+            return NO_LOG_STATUS
+
+    def sync(self, executor=None) -> tuple:
+        """
+        Bring the user's lights in line with the user's current status.
+        With an executor, several lights are updated concurrently, so one slow or unreachable light does not delay the others.
+        :param self
+        :param executor: The pool to update several lights on (optional, the lights are updated in turn without it).
+        :type executor: concurrent.futures.Executor or None
+        :return: tuple: The user's status and the light communication status of each of the user's lights by name.
+        """
+        status = self.read_status()
+        target = None
+        if status != NO_LOG_STATUS:
+            status = target = self.transition_filter.update(status)
+        acknowledged = [client.shadow.acknowledged_at for client in self.clients]
+        results = list(executor.map(lambda client: client.sync(target), self.clients)) if executor is not None and len(self.clients) > 1 else [client.sync(target) for client in self.clients]
+        light_health = {client.name: result for client, result in zip(self.clients, results)}
+        if target is not None and self.tailer.changed_at is not None and any(client.shadow.acknowledged_at != before for client, before in zip(self.clients, acknowledged)):
+            observe_end_to_end("log_write_to_light", time.time() - self.tailer.changed_at)
+        if status != self.status:
+            if status == NO_LOG_STATUS:
+                logging.error("User %s: no Teams log files found.", self.name)
+            else:
+                logging.info("User %s: status %s", self.name, status)
+        if {name for name, health in light_health.items() if health == "Connected"} != {name for name, health in self.light_health.items() if health == "Connected"}:
+            logging.info("User %s: lights %s", self.name, light_health)
+        self.status = status
+        self.light_health = light_health
+        self.syncs += 1
+        return status, light_health
+
+    def next_sync_delay(self, min_interval: float, max_interval: float) -> float:
+        """
+        Return how long the user may go without a sync when the log does not change.
+        :param self
+        :param min_interval: Seconds until the next sync while the log or a light is failing.
+        :type min_interval: float
+        :param max_interval: Seconds between syncs while everything is idle, to reconcile the lights.
+        :type max_interval: float
+        :return: float: The delay in seconds.
+        """
+        if self.status == NO_LOG_STATUS or any(health != "Connected" for health in self.light_health.values()):
+            return min_interval
+        settle = self.transition_filter.time_to_settle()
+        return max_interval if settle is None else min(settle, max_interval)
+
+    def close(self):
+        """
+        Close the light clients of the user.
+        :param self
+        :return: None
+        """
+        for client in self.clients:
+            client.close()
+
+class OfficeService():
+    """
+    Scheduler syncing many users on a bounded worker pool.
+    Users are synced as soon as their log changes, and otherwise when their next sync is due.
+    :param self
+    :param users: The status sync of each user.
+    :type users: list
+    :param workers: The maximum number of users synced at once.
+    :type workers: int
+    :param light_workers: The maximum number of light requests of users with several lights sent at once.
+    :type light_workers: int
+    :param poll_interval: Seconds between two checks of the users' logs for changes.
+    :type poll_interval: float
+    :param min_interval: Seconds until the next sync of a user whose log or lights are failing.
+    :type min_interval: float
+    :param max_interval: Seconds between syncs of an idle user.
+    :type max_interval: float
+    :param clock: Function returning the current time in seconds.
+    :type clock: callable
+    :return: None
+    """
+    def __init__(self, users: list, workers: int = 16, poll_interval: float = 0.25, min_interval: float = 2.0, max_interval: float = 60.0, clock=time.monotonic, light_workers: int = 16):
+        self.users = users
+        self.poll_interval = poll_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.clock = clock
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Office")
+        self.light_executor = ThreadPoolExecutor(max_workers=light_workers, thread_name_prefix="OfficeLight")
+        self.lock = threading.Lock()
+        self.in_flight = set()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        Start the scheduler thread.
+        :param self
+        :return: OfficeService: The running service.
+        """
+        self.thread = threading.Thread(target=self.run, name="OfficeScheduler", daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        """
+        Check the users' logs and submit the users needing a sync until stopped.
+        :param self
+        :return: None
+        """
+        logging.info("Office mode: syncing %d users on %d workers.", len(self.users), self.workers)
+        while not self.stop_event.is_set():
+            self.poll()
+            self.stop_event.wait(self.poll_interval)
+
+    def poll(self):
+        """
+        Submit every idle user whose log changed or whose next sync is due.
+        :param self
+        :return: None
+        """
+        now = self.clock()
+        for user in self.users:
+            with self.lock:
+                if user in self.in_flight:
+                    continue
+            signature = user.log_signature()
+            if signature != user.signature or now >= user.due_at:
+                user.signature = signature
+                with self.lock:
+                    self.in_flight.add(user)
+                self.executor.submit(self._sync, user)
+
+    def _sync(self, user: UserSync):
+        """
+        Sync one user on a worker and schedule its next sync.
+        :param self
+        :param user: The user to sync.
+        :type user: UserSync
+        :return: None
+        """
+        try:
+            user.sync(self.light_executor)
+        except Exception as e: # pylint: disable=broad-exception-caught
+            logging.exception("User %s: sync failed: %s", user.name, e)
+        finally:
+            user.due_at = self.clock() + user.next_sync_delay(self.min_interval, self.max_interval)
+            with self.lock:
+                self.in_flight.discard(user)
+
+    def stop(self):
+        """
+        Stop the scheduler, wait for the running syncs, shut down the light pool and close the light clients.
+        :param self
+        :return: None
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.executor.shutdown(wait=True)
+        self.light_executor.shutdown(wait=True)
+        for user in self.users:
+            user.close()
+
+def create_service() -> OfficeService:
+    """
+    Create the office service for the users in the loaded configuration.
+    :param None
+    :return: OfficeService: The office service, not started yet.
+    """
+    config = config_handler.LOADED_CONFIG
+    users = [UserSync(user, config["reconcile_interval"], config["transition_dwell"], config["transition_hysteresis"]) for user in config["users"]]
+    return OfficeService(users, config["office_workers"], config["office_poll_interval"], config["poll_min_interval"], config["poll_max_interval"], light_workers=config["office_light_workers"])
+
+def run_office():
+    """
+    Run office mode until stopped by SIGINT or SIGTERM.
+    :param None
+    :return: None
+    """
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    service = create_service().start()
+    try:
+        while not stop_event.wait(1.0):
+            pass
+    finally:
+        service.stop()
+        logging.info("Office mode stopped.")
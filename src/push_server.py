@@ -0,0 +1,414 @@
+"""
+This module publishes status transitions to local subscribers, so that dashboards and scripts
+do not have to poll the light. It runs one asyncio event loop on a background thread and offers:
+GET /status (JSON, with ETag and 304 Not Modified), GET /events (Server-Sent Events)
+and GET /ws (WebSocket).
+Each transition is written to every subscriber in one pass on the event loop,
+so idle subscribers cost no task wakeups.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import struct
+import threading
+import time
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+KEEPALIVE = 15.0
+MAX_REQUEST_SIZE = 8 * 1024
+MAX_FRAME_SIZE = 64 * 1024
+MAX_BUFFER_SIZE = 64 * 1024
+KEEPALIVES = {"sse": b": keepalive\n\n", "ws": b"\x89\x00"}
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+def websocket_accept(key: str) -> str:
+    """
+    Compute the Sec-WebSocket-Accept value answering a WebSocket handshake.
+    :param key: The Sec-WebSocket-Key request header.
+    :type key: str
+    :return: str: The accept value.
+    """
+    return base64.b64encode(hashlib.sha1(key.encode("ascii") + WEBSOCKET_GUID).digest()).decode("ascii")
+
+def websocket_frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    """
+    Build an unmasked, unfragmented WebSocket frame, as sent by a server.
+    :param payload: The frame payload.
+    :type payload: bytes
+    :param opcode: The frame opcode (0x1 text, 0x8 close, 0x9 ping, 0xA pong).
+    :type opcode: int
+    :return: bytes: The frame.
+    """
+    if len(payload) < 126:
+        header = struct.pack(">BB", 0x80 | opcode, len(payload))
+    elif len(payload) < 65536:
+        header = struct.pack(">BBH", 0x80 | opcode, 126, len(payload))
+    else:
+        header = struct.pack(">BBQ", 0x80 | opcode, 127, len(payload))
+    return header + payload
+
+async def read_websocket_frame(reader: asyncio.StreamReader) -> tuple:
+    """
+    Read one masked WebSocket frame sent by a client.
+    :param reader: The connection reader.
+    :type reader: asyncio.StreamReader
+    :return: tuple: (opcode, unmasked payload).
+    :raises ValueError: If the frame is not masked or too large.
+    """
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", await reader.readexactly(8))[0]
+    if not second & 0x80 or length > MAX_FRAME_SIZE:
+        raise ValueError("Unmasked or oversized WebSocket frame")
+    mask = await reader.readexactly(4)
+    payload = await reader.readexactly(length)
+    return first & 0x0F, bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+class PushServer():
+    """
+    Local server publishing the current status and every transition to HTTP, SSE and WebSocket clients.
+    All subscribers share one event loop; an idle subscriber costs a connection and a pending read.
+    :param self
+    :param host: The address to listen on.
+    :type host: str
+    :param port: The port to listen on (0 for any free port).
+    :type port: int
+    :return: None
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.epoch = int(time.time())
+        self.version = 0
+        self.state = None
+        self.message = b"{}"
+        self.frames = {}
+        self.streams = {}
+        self.connections = set()
+
+    def start(self):
+        """
+        Start the event loop and the server on a background thread.
+        :param self
+        :return: PushServer: The running server.
+        :raises OSError: If the server cannot listen on the address.
+        """
+        ready = threading.Event()
+        errors = []
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                self.server = loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port, limit=MAX_REQUEST_SIZE, backlog=1024))
+            except OSError as e:
+                errors.append(e)
+                ready.set()
+                loop.close()
+                return
+            self.port = self.server.sockets[0].getsockname()[1]
+            self.loop = loop
+            self._encode()
+            loop.call_later(KEEPALIVE, self._keepalive)
+            ready.set()
+            loop.run_forever()
+        self.thread = threading.Thread(target=run, name="PushServer", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        logging.info("Publishing status on http://%s:%d/status, /events and /ws", self.host, self.port)
+        return self
+
+    def stop(self):
+        """
+        Close the server and stop the event loop.
+        :param self
+        :return: None
+        """
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=2)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=2)
+            self.loop = None
+
+    async def _shutdown(self):
+        """
+        Stop accepting connections and close the connections of all subscribers. Runs on the event loop.
+        :param self
+        :return: None
+        """
+        self.server.close()
+        for writer in list(self.connections):
+            writer.close()
+        await self.server.wait_closed()
+
+    def publish(self, status: str, lights: dict = None):
+        """
+        Publish the current status; nothing is sent if neither the status nor the light health changed. Thread-safe.
+        :param self
+        :param status: The status shown on the lights.
+        :type status: str
+        :param lights: The light communication status of each light by name (optional).
+        :type lights: dict or None
+        :return: None
+        """
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._publish, status, dict(lights or {}))
+
+    def _publish(self, status: str, lights: dict):
+        """
+        Update the state and wake up the subscribers. Runs on the event loop.
+        :param self
+        :param status: The status shown on the lights.
+        :type status: str
+        :param lights: The light communication status of each light by name.
+        :type lights: dict
+        :return: None
+        """
+        if (status, lights) == self.state:
+            return
+        self.state = (status, lights)
+        self.version += 1
+        self.message = json.dumps({"status": status, "lights": lights, "version": self.version, "changed_at": time.time()}, separators=(",", ":")).encode("utf-8")
+        self._encode()
+        self._send(self.frames)
+
+    def _encode(self):
+        """
+        Encode the current state in each stream format.
+        :param self
+        :return: None
+        """
+        self.frames = {"sse": b"id: %d\nevent: status\ndata: %s\n\n" % (self.version, self.message), "ws": websocket_frame(self.message)}
+
+    @property
+    def subscribers(self) -> int:
+        """
+        The number of connected SSE and WebSocket subscribers.
+        :param self
+        :return: int: The subscriber count.
+        """
+        return len(self.streams)
+
+    @property
+    def etag(self) -> str:
+        """
+        The entity tag of the current state, unique across restarts of the server.
+        :param self
+        :return: str: The quoted ETag.
+        """
+        return f'"{self.epoch}-{self.version}"'
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serve one client connection, answering GET /status requests until the connection closes or switches to a stream.
+        :param self
+        :param reader: The connection reader.
+        :type reader: asyncio.StreamReader
+        :param writer: The connection writer.
+        :type writer: asyncio.StreamWriter
+        :return: None
+        """
+        self.connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    return
+                method, path, headers = self._parse(request)
+                if method is None:
+                    await self._respond(writer, 400)
+                    return
+                if method != "GET":
+                    await self._respond(writer, 405)
+                elif path == "/status":
+                    if headers.get("if-none-match") == self.etag:
+                        await self._respond(writer, 304, headers={"ETag": self.etag})
+                    else:
+                        await self._respond(writer, 200, self.message, {"ETag": self.etag, "Cache-Control": "no-cache"})
+                elif path == "/events":
+                    await self._serve_events(reader, writer)
+                    return
+                elif path == "/ws" and headers.get("upgrade", "").lower() == "websocket" and "sec-websocket-key" in headers:
+                    await self._serve_websocket(reader, writer, headers["sec-websocket-key"])
+                    return
+                else:
+                    await self._respond(writer, 404)
+                if headers.get("connection", "").lower() == "close":
+                    return
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            logging.debug("Push client disconnected: %s", e)
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    def _parse(self, request: bytes) -> tuple:
+        """
+        Parse an HTTP request head.
+        :param self
+        :param request: The request line and headers.
+        :type request: bytes
+        :return: tuple: (method, path without query, lower-cased headers), or (None, None, None) if malformed.
+        """
+        try:
+            lines = request.decode("latin-1").split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            return None, None, None
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        return method, target.split("?", 1)[0], headers
+
+    async def _respond(self, writer: asyncio.StreamWriter, code: int, body: bytes = b"", headers: dict = None):
+        """
+        Send an HTTP response.
+        :param self
+        :param writer: The connection writer.
+        :type writer: asyncio.StreamWriter
+        :param code: The status code.
+        :type code: int
+        :param body: The JSON body.
+        :type body: bytes
+        :param headers: Extra response headers (optional).
+        :type headers: dict or None
+        :return: None
+        """
+        head = [f"HTTP/1.1 {code} {REASONS[code]}", f"Content-Length: {len(body)}"]
+        if body:
+            head.append("Content-Type: application/json")
+        head.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _serve_events(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Stream the current status and every transition as Server-Sent Events.
+        :param self
+        :param reader: The connection reader, watched for the client going away.
+        :type reader: asyncio.StreamReader
+        :param writer: The connection writer.
+        :type writer: asyncio.StreamWriter
+        :return: None
+        """
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n")
+        await self._stream(writer, self._drain_until_closed(reader), "sse")
+
+    async def _serve_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, key: str):
+        """
+        Complete the WebSocket handshake and send the current status and every transition as text messages.
+        :param self
+        :param reader: The connection reader, answering pings and close frames from the client.
+        :type reader: asyncio.StreamReader
+        :param writer: The connection writer.
+        :type writer: asyncio.StreamWriter
+        :param key: The Sec-WebSocket-Key request header.
+        :type key: str
+        :return: None
+        """
+        writer.write(f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n".encode("ascii"))
+        await self._stream(writer, self._read_websocket(reader, writer), "ws")
+
+    async def _drain_until_closed(self, reader: asyncio.StreamReader):
+        """
+        Discard anything an SSE client sends until it closes the connection.
+        :param self
+        :param reader: The connection reader.
+        :type reader: asyncio.StreamReader
+        :return: None
+        """
+        try:
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            return
+
+    async def _read_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Answer pings and return when the client closes the WebSocket.
+        :param self
+        :param reader: The connection reader.
+        :type reader: asyncio.StreamReader
+        :param writer: The connection writer.
+        :type writer: asyncio.StreamWriter
+        :return: None
+        """
+        try:
+            while True:
+                opcode, payload = await read_websocket_frame(reader)
+                if opcode == 0x8:
+                    writer.write(websocket_frame(payload[:2], 0x8))
+                    return
+                if opcode == 0x9:
+                    writer.write(websocket_frame(payload, 0xA))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            return
+
+    async def _stream(self, writer: asyncio.StreamWriter, closed, kind: str):
+        """
+        Subscribe a connection to the state in a stream format, send it the current state and wait until the client goes away.
+        :param self
+        :param writer: The connection writer.
+        :type writer: asyncio.StreamWriter
+        :param closed: Coroutine returning when the client closed the connection.
+        :type closed: Coroutine
+        :param kind: The stream format ("sse" or "ws").
+        :type kind: str
+        :return: None
+        """
+        writer.write(self.frames[kind])
+        self.streams[writer] = kind
+        try:
+            await closed
+        finally:
+            self.streams.pop(writer, None)
+
+    def _send(self, frames: dict):
+        """
+        Write a message to every subscriber without waiting for any of them.
+        Subscribers that stopped reading are disconnected instead of buffering messages without bound.
+        :param self
+        :param frames: The message in each stream format.
+        :type frames: dict
+        :return: None
+        """
+        for writer, kind in list(self.streams.items()):
+            if writer.transport.get_write_buffer_size() > MAX_BUFFER_SIZE:
+                logging.debug("Disconnecting push subscriber that stopped reading.")
+                self.streams.pop(writer)
+                writer.close()
+            else:
+                writer.write(frames[kind])
+
+    def _keepalive(self):
+        """
+        Send a keepalive to every subscriber and schedule the next one. Runs on the event loop.
+        :param self
+        :return: None
+        """
+        self._send(KEEPALIVES)
+        self.loop.call_later(KEEPALIVE, self._keepalive)
+
+def start_server(host: str, port: int) -> PushServer:
+    """
+    Publish the status to local subscribers from a background thread.
+    :param host: The address to listen on.
+    :type host: str
+    :param port: The port to listen on.
+    :type port: int
+    :return: PushServer: The running server.
+    """
+    return PushServer(host, port).start()
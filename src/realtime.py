@@ -0,0 +1,196 @@
+"""
+This module pushes colors to WLED lights over its UDP realtime protocols (DRGB, DNRGB and DDP),
+which skip the TCP handshake and HTTP parsing of the JSON API.
+UDP is fire and forget, so state reads keep using HTTP
+and the light handler falls back to HTTP when a send fails.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import logging
+import socket
+import struct
+import threading
+import time
+
+TRANSPORTS = ("http", "drgb", "dnrgb", "ddp")
+WLED_UDP_PORT = 21324
+DDP_PORT = 4048
+DRGB = 2
+DNRGB = 4
+DRGB_MAX_LEDS = 490
+DNRGB_MAX_LEDS = 489
+DDP_MAX_LEDS = 480
+DDP_HEADER = struct.Struct(">BBBBIH")
+DDP_VERSION = 0x40
+DDP_PUSH = 0x01
+DDP_RGB8 = 0x0B
+DDP_DEFAULT_OUTPUT = 0x01
+NO_TIMEOUT = 255
+DDP_KEEPALIVE = 1.0
+
+def drgb_packets(pixels: bytes, timeout: int = NO_TIMEOUT) -> list:
+    """
+    Build the DRGB packets for a frame, switching to DNRGB when the frame has more LEDs than one DRGB packet holds.
+    :param pixels: The RGB bytes of every LED, starting with the first LED.
+    :type pixels: bytes
+    :param timeout: Seconds the light stays in realtime mode after the last packet (255 = until told otherwise).
+    :type timeout: int
+    :return: list: The packets to send.
+    """
+    if len(pixels) > DRGB_MAX_LEDS * 3:
+        return dnrgb_packets(pixels, timeout)
+    return [bytes((DRGB, timeout)) + pixels]
+
+def dnrgb_packets(pixels: bytes, timeout: int = NO_TIMEOUT) -> list:
+    """
+    Build the DNRGB packets for a frame, each carrying its start LED index.
+    :param pixels: The RGB bytes of every LED, starting with the first LED.
+    :type pixels: bytes
+    :param timeout: Seconds the light stays in realtime mode after the last packet (255 = until told otherwise).
+    :type timeout: int
+    :return: list: The packets to send.
+    """
+    return [bytes((DNRGB, timeout, start >> 8, start & 0xFF)) + pixels[start * 3:(start + DNRGB_MAX_LEDS) * 3]
+            for start in range(0, max(len(pixels) // 3, 1), DNRGB_MAX_LEDS)]
+
+def ddp_packets(pixels: bytes, sequence: int = 1) -> list:
+    """
+    Build the DDP packets for a frame, setting the push flag on the last one so the light shows the whole frame at once.
+    :param pixels: The RGB bytes of every LED, starting with the first LED.
+    :type pixels: bytes
+    :param sequence: The sequence number of the frame, from 1 to 15.
+    :type sequence: int
+    :return: list: The packets to send.
+    """
+    chunk = DDP_MAX_LEDS * 3
+    offsets = range(0, max(len(pixels), 1), chunk)
+    return [DDP_HEADER.pack(DDP_VERSION | (DDP_PUSH if offset == offsets[-1] else 0), sequence, DDP_RGB8, DDP_DEFAULT_OUTPUT, offset, len(pixels[offset:offset + chunk])) + pixels[offset:offset + chunk]
+            for offset in offsets]
+
+class UDPTransport():
+    """
+    UDP realtime sender for a single light.
+    The socket is connected to the light, so an ICMP port unreachable answer to one packet makes the next send fail.
+    Status colors are sent as frames of identical LEDs, whose packets are built once per color.
+    DDP has no timeout of its own, so the last DDP frame is repeated as a keepalive to keep the light in realtime mode.
+    :param self
+    :param host: The host name or IP address of the light.
+    :type host: str
+    :param protocol: The realtime protocol ("drgb", "dnrgb" or "ddp").
+    :type protocol: str
+    :param led_count: The number of LEDs of the light (0 if not known yet).
+    :type led_count: int
+    :param port: The UDP port of the light (0 for the protocol default).
+    :type port: int
+    :return: None
+    """
+    def __init__(self, host: str, protocol: str, led_count: int = 0, port: int = 0):
+        if protocol not in TRANSPORTS[1:]:
+            raise ValueError(f"Unknown realtime protocol: {protocol!r}")
+        self.host = host
+        self.protocol = protocol
+        self.led_count = led_count
+        self.port = port or (DDP_PORT if protocol == "ddp" else WLED_UDP_PORT)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.connected = False
+        self.lock = threading.Lock()
+        self.sequence = 0
+        self.cache = {}
+        self.last_packets = None
+        self.keepalive = None
+        self.sent = 0
+        self.sent_at = 0.0
+
+    def packets(self, pixels: bytes) -> list:
+        """
+        Build the packets of a frame in the configured protocol.
+        :param self
+        :param pixels: The RGB bytes of every LED.
+        :type pixels: bytes
+        :return: list: The packets to send.
+        """
+        if self.protocol == "ddp":
+            self.sequence = self.sequence % 15 + 1
+            return ddp_packets(pixels, self.sequence)
+        if self.protocol == "dnrgb":
+            return dnrgb_packets(pixels)
+        return drgb_packets(pixels)
+
+    def send_color(self, color: tuple) -> bool:
+        """
+        Set every LED of the light to one color.
+        :param self
+        :param color: The (r, g, b) color, (0, 0, 0) to turn the LEDs off.
+        :type color: tuple
+        :return: bool: True if the packets were handed to the network.
+        """
+        packets = self.cache.get(color)
+        if packets is None:
+            packets = self.cache[color] = self.packets(bytes(color) * self.led_count)
+        return self.send_packets(packets)
+
+    def send_frame(self, pixels: bytes) -> bool:
+        """
+        Send a frame with a color per LED.
+        :param self
+        :param pixels: The RGB bytes of every LED.
+        :type pixels: bytes
+        :return: bool: True if the packets were handed to the network.
+        """
+        return self.send_packets(self.packets(pixels))
+
+    def send_packets(self, packets: list) -> bool:
+        """
+        Send prepared packets to the light.
+        :param self
+        :param packets: The packets to send.
+        :type packets: list
+        :return: bool: True if the packets were handed to the network.
+        """
+        try:
+            with self.lock:
+                if not self.connected:
+                    self.socket.connect((self.host, self.port))
+                    self.connected = True
+                for packet in packets:
+                    self.socket.send(packet)
+                self.sent += len(packets)
+                self.sent_at = time.monotonic()
+                self.last_packets = packets
+        except OSError as e:
+            logging.error("Error sending %s packets to %s: %s", self.protocol.upper(), self.host, e)
+            return False
+        if self.protocol == "ddp" and self.keepalive is None:
+            self.keepalive = threading.Event()
+            threading.Thread(target=self._keepalive, args=(self.keepalive,), name="DDPKeepalive", daemon=True).start()
+        return True
+
+    def _keepalive(self, stop_event: threading.Event):
+        """
+        Repeat the last frame until the transport is closed, as WLED leaves DDP realtime mode after a few seconds without packets.
+        Nothing is repeated while frames are being sent anyway, e.g. by an effect.
+        :param self
+        :param stop_event: Event set when the transport is closed.
+        :type stop_event: threading.Event
+        :return: None
+        """
+        while not stop_event.wait(DDP_KEEPALIVE):
+            if time.monotonic() - self.sent_at < DDP_KEEPALIVE:
+                continue
+            try:
+                with self.lock:
+                    for packet in self.last_packets:
+                        self.socket.send(packet)
+            except OSError as e:
+                logging.debug("Error repeating DDP frame to %s: %s", self.host, e)
+
+    def close(self):
+        """
+        Stop the keepalive and close the socket.
+        :param self
+        :return: None
+        """
+        if self.keepalive is not None:
+            self.keepalive.set()
+            self.keepalive = None
+        self.socket.close()
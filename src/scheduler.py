@@ -0,0 +1,115 @@
+"""
+This module decides when the next status update runs.
+It polls quickly right after a status transition, slows down during idle stretches,
+backs off exponentially with jitter while the light or Teams logs are unreachable
+and recovers as soon as they answer again.
+While the lights back off by themselves, their earliest retry sets the pace,
+so the two backoffs never stack.
+The clock and random source are injectable so the policy can be exercised with a fake clock.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import random
+import time
+
+class Backoff():
+    """
+    Exponential backoff with jitter.
+    :param self
+    :param base: Delay in seconds after the first failure.
+    :type base: float
+    :param maximum: Upper bound of the delay in seconds.
+    :type maximum: float
+    :param jitter: Fraction by which each delay is randomly lengthened or shortened, from 0 to 1.
+    :type jitter: float
+    :param rng: Function returning a random float in [0, 1).
+    :type rng: callable
+    :return: None
+    """
+    def __init__(self, base: float = 5.0, maximum: float = 300.0, jitter: float = 0.2, rng=random.random):
+        self.base = base
+        self.maximum = maximum
+        self.jitter = jitter
+        self.rng = rng
+        self.failures = 0
+
+    def failure(self) -> float:
+        """
+        Record a failure and return how long to wait before the next attempt.
+        :param self
+        :return: float: The delay in seconds.
+        """
+        self.failures += 1
+        delay = min(self.base * 2 ** (self.failures - 1), self.maximum)
+        return delay * (1 + self.jitter * (2 * self.rng() - 1))
+
+    def reset(self):
+        """
+        Record a success, so that the next failure starts from the base delay again.
+        :param self
+        :return: None
+        """
+        self.failures = 0
+
+class PollScheduler():
+    """
+    Adaptive polling policy for the status update loop.
+    :param self
+    :param min_interval: Delay in seconds right after a status transition.
+    :type min_interval: float
+    :param max_interval: Delay in seconds during long idle stretches.
+    :type max_interval: float
+    :param backoff: The backoff used while the light is unreachable (optional).
+    :type backoff: Backoff or None
+    :param clock: Function returning the current time in seconds.
+    :type clock: callable
+    :return: None
+    """
+    def __init__(self, min_interval: float = 2.0, max_interval: float = 60.0, backoff: Backoff = None, clock=time.monotonic):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff or Backoff()
+        self.clock = clock
+        self.status = None
+        self.interval = min_interval
+        self.next_run = None
+        self.failing = False
+
+    @property
+    def failures(self) -> int:
+        """
+        The number of consecutive failed updates.
+        :param self
+        :return: int: The failure count, 0 while healthy.
+        """
+        return self.backoff.failures
+
+    def record(self, status, healthy: bool, retry_in: float = None) -> float:
+        """
+        Record the outcome of an update and return the delay until the next one.
+        :param self
+        :param status: The status found by the update (None if none was extracted).
+        :type status: str or None
+        :param healthy: Whether the light and Teams logs could be reached.
+        :type healthy: bool
+        :param retry_in: Seconds until the earliest retry of the lights, when they are backing off by themselves (optional).
+        :type retry_in: float or None
+        :return: float: The delay in seconds until the next update.
+        """
+        if not healthy:
+            self.failing = True
+            delay = retry_in if retry_in is not None else self.backoff.failure()
+        else:
+            recovered = self.failing
+            self.failing = False
+            self.backoff.reset()
+            transitioned = status is not None and status != self.status
+            if transitioned:
+                self.status = status
+            if recovered or transitioned:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * 2, self.max_interval)
+            delay = self.interval
+        self.next_run = self.clock() + delay
+        return delay
@@ -0,0 +1,308 @@
+"""
+This module keeps a timeline of Teams status transitions,
+so that questions such as "time in Busy today" can be answered.
+The Teams log is streamed once into compact (timestamp, status) records in a binary history file,
+and the byte offset and identity of the log file are checkpointed
+so that a restart resumes where it stopped instead of rescanning.
+Memory use is bounded by the read chunk size, whatever the size of the log.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import array
+import bisect
+import datetime
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from teams_handler import FINGERPRINT_SIZE, MAX_PARTIAL_LINE, READ_CHUNK_SIZE, STATUSES, parse_status_line
+from io_worker import IOWorker
+
+STATUS_CODES = STATUSES + ("Unknown",)
+RECORD = struct.Struct("<dB")
+CHECKPOINT_SUFFIX = ".checkpoint"
+CHECKPOINT_INTERVAL = 60.0
+
+def parse_timestamp(line: bytes):
+    """
+    Parse the ISO 8601 timestamp at the start of a Teams log line.
+    :param line: The raw log line.
+    :type line: bytes
+    :return: float or None: The timestamp in seconds since the epoch, or None if the line does not start with one.
+    """
+    try:
+        return datetime.datetime.fromisoformat(line.split(b" ", 1)[0].decode("ascii")).timestamp()
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def iter_status_lines(f, offset: int = 0):
+    """
+    Stream the status lines of a log file in fixed size chunks, from the given offset to the end of the last complete line.
+    :param f: The log file, opened in binary mode.
+    :type f: BinaryIO
+    :param offset: The byte offset to start reading from, at the start of a line.
+    :type offset: int
+    :return: Iterator[tuple]: (offset after the line, timestamp or None, status) for each status line.
+    """
+    f.seek(offset)
+    partial = b""
+    while True:
+        chunk = f.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return
+        data = partial + chunk
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            partial = data[-MAX_PARTIAL_LINE:] if len(data) > MAX_PARTIAL_LINE else data
+            offset += len(data) - len(partial)
+            continue
+        start = offset
+        position = data.find(b"status ", 0, end)
+        while position != -1:
+            line_start = data.rfind(b"\n", 0, position) + 1
+            line_end = data.find(b"\n", position) + 1
+            line = data[line_start:line_end]
+            yield start + line_end, parse_timestamp(line), parse_status_line(line)
+            position = data.find(b"status ", line_end, end)
+        offset += end
+        partial = data[end:]
+
+def iter_transitions(lines, status=None, timestamp=None):
+    """
+    Collapse a stream of status lines into status transitions.
+    Lines without a timestamp take the timestamp of the previous line.
+    :param lines: The status lines, as produced by iter_status_lines.
+    :type lines: Iterator[tuple]
+    :param status: The status before the first line (optional).
+    :type status: str or None
+    :param timestamp: The timestamp of the last known line (optional).
+    :type timestamp: float or None
+    :return: Iterator[tuple]: (offset after the line, timestamp, status) for each line changing the status.
+    """
+    for offset, line_timestamp, line_status in lines:
+        timestamp = line_timestamp if line_timestamp is not None else timestamp
+        if line_status != status and timestamp is not None:
+            status = line_status
+            yield offset, timestamp, status
+
+class StatusHistory():
+    """
+    Append-only timeline of status transitions, backed by a binary file of fixed size records
+    and a checkpoint of how far the Teams log has been read.
+    Only one process may write the history; a read-only history (e.g. for --history while the application runs)
+    keeps the transitions it reads from the Teams log in memory and never touches the files.
+    :param self
+    :param path: The history file path; the checkpoint is stored next to it.
+    :type path: str
+    :param read_only: Whether to leave the history and checkpoint files untouched.
+    :type read_only: bool
+    :return: None
+    """
+    def __init__(self, path: str, read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        self.checkpoint_path = path + CHECKPOINT_SUFFIX
+        self.lock = threading.Lock()
+        self.timestamps = array.array("d")
+        self.codes = bytearray()
+        self.checkpoint = {}
+        self.saved_at = float("-inf")
+        self.load()
+
+    def load(self):
+        """
+        Load the checkpoint and the records, dropping records written after the last checkpoint.
+        A read-only history ignores them instead, as the writer may be about to checkpoint them.
+        :param self
+        :return: None
+        """
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                self.checkpoint = json.load(f)
+        except (OSError, ValueError):
+            self.checkpoint = {}
+        count = self.checkpoint.get("records", 0)
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read(count * RECORD.size)
+        except FileNotFoundError:
+            data = b""
+        if len(data) != count * RECORD.size:
+            logging.warning("Status history is shorter than its checkpoint, starting over.")
+            self.checkpoint, data = {}, b""
+        for timestamp, code in RECORD.iter_unpack(data):
+            self.timestamps.append(timestamp)
+            self.codes.append(code)
+        if not self.read_only and os.path.exists(self.path) and os.path.getsize(self.path) != len(data):
+            with open(self.path, "r+b") as f:
+                f.truncate(len(data))
+
+    @property
+    def status(self):
+        """
+        The last recorded status.
+        :param self
+        :return: str or None: The status, or None if nothing was recorded yet.
+        """
+        return STATUS_CODES[self.codes[-1]] if self.codes else None
+
+    def update(self, logfile: str) -> int:
+        """
+        Read the Teams log from the checkpoint on and append the status transitions found.
+        A different or truncated log file (e.g. after a rotation) is read from its start.
+        A read-only history appends them in memory only.
+        The checkpoint is written when transitions were appended, and otherwise at most every CHECKPOINT_INTERVAL seconds,
+        so that log writes without a status change cause no disk writes; resuming from an older offset only rereads a few lines.
+        :param self
+        :param logfile: The file path of the Teams log file.
+        :type logfile: str
+        :return: int: The number of transitions appended.
+        """
+        with self.lock, open(logfile, "rb") as f:
+            stat = os.fstat(f.fileno())
+            fingerprint = f.read(FINGERPRINT_SIZE).hex()
+            offset = self.checkpoint.get("offset", 0)
+            if (self.checkpoint.get("path") != logfile or self.checkpoint.get("identity") != [stat.st_dev, stat.st_ino]
+                    or self.checkpoint.get("fingerprint") != fingerprint[:len(self.checkpoint.get("fingerprint", ""))]
+                    or stat.st_size < offset):
+                offset = 0
+            last = self.timestamps[-1] if self.timestamps else None
+            lines = (line for line in iter_status_lines(f, offset) if last is None or line[1] is None or line[1] >= last)
+            records = bytearray()
+            for offset, timestamp, status in iter_transitions(lines, self.status, last):
+                code = STATUS_CODES.index(status) if status in STATUS_CODES else STATUS_CODES.index("Unknown")
+                self.timestamps.append(timestamp)
+                self.codes.append(code)
+                records += RECORD.pack(timestamp, code)
+            checkpoint = {"path": logfile, "identity": [stat.st_dev, stat.st_ino], "fingerprint": fingerprint,
+                          "offset": self._complete_offset(f, offset), "records": len(self.codes)}
+            if records or (checkpoint != self.checkpoint and time.monotonic() - self.saved_at >= CHECKPOINT_INTERVAL):
+                self._save(records, checkpoint)
+            else:
+                self.checkpoint = checkpoint
+        if records:
+            logging.info("Recorded %d status transitions from %s", len(records) // RECORD.size, logfile)
+        return len(records) // RECORD.size
+
+    def _complete_offset(self, f, offset: int) -> int:
+        """
+        Return the offset after the last complete line read, so that the checkpoint never points into a line.
+        :param self
+        :param f: The log file, read up to its end.
+        :type f: BinaryIO
+        :param offset: The offset after the last status line read.
+        :type offset: int
+        :return: int: The offset to resume from.
+        """
+        end = f.tell()
+        start = max(offset, end - MAX_PARTIAL_LINE)
+        f.seek(start)
+        tail = f.read(end - start)
+        newline = tail.rfind(b"\n")
+        return start + newline + 1 if newline != -1 else offset
+
+    def _save(self, records: bytes, checkpoint: dict):
+        """
+        Append the new records and atomically replace the checkpoint, or only keep the checkpoint in memory if read-only.
+        :param self
+        :param records: The packed records to append.
+        :type records: bytes
+        :param checkpoint: The new checkpoint.
+        :type checkpoint: dict
+        :return: None
+        """
+        if self.read_only:
+            self.checkpoint = checkpoint
+            return
+        if records:
+            with open(self.path, "ab") as f:
+                f.write(records)
+                f.flush()
+                os.fsync(f.fileno())
+        temporary = self.checkpoint_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(temporary, self.checkpoint_path)
+        self.checkpoint = checkpoint
+        self.saved_at = time.monotonic()
+
+    def transitions(self, start: float, end: float) -> list:
+        """
+        Return the status transitions within a time range.
+        :param self
+        :param start: The start of the range, in seconds since the epoch.
+        :type start: float
+        :param end: The end of the range, in seconds since the epoch.
+        :type end: float
+        :return: list: (timestamp, status) for each transition in the range.
+        """
+        with self.lock:
+            first = bisect.bisect_left(self.timestamps, start)
+            last = bisect.bisect_right(self.timestamps, end)
+            return [(self.timestamps[i], STATUS_CODES[self.codes[i]]) for i in range(first, last)]
+
+    def time_in_status(self, start: float, end: float = None) -> dict:
+        """
+        Return how long each status was held within a time range.
+        The status in effect at the start of the range counts from the start, and the last status counts until the end of the range or now.
+        :param self
+        :param start: The start of the range, in seconds since the epoch.
+        :type start: float
+        :param end: The end of the range, in seconds since the epoch (optional, defaults to now).
+        :type end: float or None
+        :return: dict: The seconds spent in each status.
+        """
+        end = min(end if end is not None else time.time(), time.time())
+        totals = {}
+        with self.lock:
+            index = bisect.bisect_right(self.timestamps, start) - 1
+            segment_start, code = (start, self.codes[index]) if index >= 0 else (None, None)
+            for i in range(index + 1, bisect.bisect_right(self.timestamps, end)):
+                if code is not None:
+                    totals[STATUS_CODES[code]] = totals.get(STATUS_CODES[code], 0.0) + self.timestamps[i] - segment_start
+                segment_start, code = self.timestamps[i], self.codes[i]
+            if code is not None and end > segment_start:
+                totals[STATUS_CODES[code]] = totals.get(STATUS_CODES[code], 0.0) + end - segment_start
+        return totals
+
+HISTORY = None
+WORKER = IOWorker("History")
+
+def get_history(path: str) -> StatusHistory:
+    """
+    Return the status history stored at the given path, loading it on first use.
+    :param path: The history file path.
+    :type path: str
+    :return: StatusHistory: The status history.
+    """
+    global HISTORY
+    if HISTORY is None or HISTORY.path != path:
+        HISTORY = StatusHistory(path)
+    return HISTORY
+
+def record_history(path: str, logfile: str):
+    """
+    Bring the status history up to date with the Teams log on the history worker thread, so the light sync never waits on it.
+    Requests made while an update is still pending are coalesced.
+    :param path: The history file path.
+    :type path: str
+    :param logfile: The file path of the Teams log file.
+    :type logfile: str
+    :return: None
+    """
+    WORKER.submit("history", lambda: get_history(path).update(logfile))
+
+def today_summary(history: StatusHistory) -> str:
+    """
+    Format the time spent in each status since local midnight.
+    :param history: The status history.
+    :type history: StatusHistory
+    :return: str: One line per status, such as "Busy: 2h 05m".
+    """
+    midnight = datetime.datetime.combine(datetime.date.today(), datetime.time()).timestamp()
+    totals = history.time_in_status(midnight)
+    if not totals:
+        return "No status recorded today."
+    return "\n".join(f"{status}: {int(seconds // 3600)}h {int(seconds % 3600 // 60):02d}m" for status, seconds in sorted(totals.items(), key=lambda item: -item[1]))
@@ -9,22 +9,257 @@ import glob
 import mmap
 import os
 import logging
-from tkinter import messagebox
 import config_handler
+from metrics import span
 
-def get_teams_path() -> str:
+STATUSES = ("Available", "Away", "Busy", "Do not disturb")
+READ_CHUNK_SIZE = 64 * 1024
+MAX_PARTIAL_LINE = 64 * 1024
+FINGERPRINT_SIZE = 64
+
+def parse_status_line(line: bytes) -> str:
+    """
+    Parse the status out of a log line starting at its last "status" token.
+    :param line: The raw log line (or line fragment) containing a "status" token.
+    :type line: bytes
+    :return: str: The parsed status, or "Unknown" if the line does not hold a known status.
+    """
+    text = line[line.rfind(b"status"):].decode("utf-8", errors="replace")
+    if any(status in text for status in STATUSES) and "status " in text:
+        return text.split("status ", 1)[1].strip()
+    return "Unknown"
+
+def teams_log_pattern() -> str:
     """
-    Return file path of latest Teams Log file.
+    Return the glob pattern matching the Teams log files.
     :param None
-    :return: str: The file path of the latest Teams log file.
+    :return: str: The glob pattern of the Teams log files.
+    """
+    return str(os.getenv('LOCALAPPDATA')) + "\\Packages\\MSTeams_*\\LocalCache\\Microsoft\\MSTeams\\Logs\\MSTeams_*.log"
+
+class LogIndex():
+    """
+    Cached listing of the Teams log files matching a glob pattern, ordered by modification time.
+    The listing is only refreshed when a log directory's modification time changes
+    (a file was created, renamed or removed) or when the log watcher invalidates it.
+    :param self
+    :param pattern: The Teams log path glob pattern (or the path of a single log file).
+    :type pattern: str
+    :return: None
+    """
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.directories = {}
+        self.files = []
+        self.stale = True
+
+    def invalidate(self):
+        """
+        Mark the listing as outdated, so that the next lookup lists the log directories again.
+        :param self
+        :return: None
+        """
+        self.stale = True
+
+    def latest(self):
+        """
+        Return the most recently modified log file, refreshing the listing only when needed.
+        :param self
+        :return: str or None: The path of the newest log file, or None if there is none.
+        """
+        if self.stale or not self.files or self._directories_changed():
+            self.refresh()
+        return self.files[-1] if self.files else None
+
+    def refresh(self):
+        """
+        List the log directories and order the matching log files by modification and creation time.
+        :param self
+        :return: None
+        """
+        self.stale = False
+        entries = []
+        for logfile in glob.glob(self.pattern):
+            try:
+                stat = os.stat(logfile)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_ctime_ns, logfile))
+        entries.sort()
+        self.files = [logfile for _, _, logfile in entries]
+        self.directories = {}
+        for directory in {os.path.dirname(logfile) for logfile in self.files}:
+            try:
+                self.directories[directory] = os.stat(directory).st_mtime_ns
+            except FileNotFoundError:
+                pass
+        logging.debug("Teams log index refreshed: %d files, latest %s", len(self.files), self.files[-1] if self.files else None)
+
+    def _directories_changed(self) -> bool:
+        """
+        Check whether any log directory was modified since the last listing.
+        :param self
+        :return: bool: True if a log directory changed or disappeared.
+        """
+        for directory, mtime in self.directories.items():
+            try:
+                if os.stat(directory).st_mtime_ns != mtime:
+                    return True
+            except FileNotFoundError:
+                return True
+        return False
+
+class LogTailer():
+    """
+    Follow a Teams log file incrementally, remembering the file identity and byte offset
+    so that each call only reads the bytes appended since the previous one.
+    The identity is the device/inode pair plus a fingerprint of the first bytes of the file,
+    so a log recreated under a recycled inode is still detected as a rotation.
+    A full scan of the file is only done on first use, after truncation or after rotation.
+    :param self
+    :return: None
     """
-    try:
-        teams_path = str(os.getenv('LOCALAPPDATA')) + "\\Packages\\MSTeams_*\\LocalCache\\Microsoft\\MSTeams\\Logs\\MSTeams_*.log"
-        teams_path = glob.glob(teams_path)[-1]
-        logging.info("Teams log file path: %s", teams_path)
-        return teams_path
-    except IndexError:
-        return "Error: No Teams log files found."
+    def __init__(self):
+        self.path = None
+        self.identity = None
+        self.fingerprint = b""
+        self.offset = 0
+        self.partial = b""
+        self.status = "Unknown"
+        self.changed_at = None
+
+    def read_status(self, logfile: str) -> str:
+        """
+        Return the latest status found in the log file, reading only newly appended bytes when possible.
+        :param self
+        :param logfile: The file path of the Teams log file to follow.
+        :type logfile: str
+        :return: str: The latest status in the log file ("Available", "Busy", "Away", or "Unknown").
+        """
+        stat = os.stat(logfile)
+        identity = (stat.st_dev, stat.st_ino)
+        if logfile != self.path or identity != self.identity or stat.st_size < self.offset or not self._same_fingerprint():
+            logging.info("Teams log rotated or truncated, rescanning: %s", logfile)
+            self.path = logfile
+            self.identity = identity
+            self.status = "Unknown"
+            self.changed_at = None
+            self._full_scan(stat.st_size)
+        if stat.st_size > self.offset:
+            previous = self.status
+            self._read_delta(stat.st_size)
+            if self.status != previous:
+                self.changed_at = stat.st_mtime
+        return self.status
+
+    def rotate(self, logfile: str):
+        """
+        Hand over from the followed log file to the newer file it was rotated to.
+        Lines appended to the old file since the last read are consumed first, and the new file is then
+        read from its beginning, so the status carries over until the new file reports one.
+        :param self
+        :param logfile: The file path of the new Teams log file.
+        :type logfile: str
+        :return: None
+        """
+        logging.info("Teams log rotated from %s to %s", self.path, logfile)
+        try:
+            stat = os.stat(self.path)
+            if (stat.st_dev, stat.st_ino) == self.identity and stat.st_size > self.offset:
+                self._read_delta(stat.st_size)
+        except FileNotFoundError:
+            pass
+        stat = os.stat(logfile)
+        self.path = logfile
+        self.identity = (stat.st_dev, stat.st_ino)
+        self.fingerprint = b""
+        self.offset = 0
+        self.partial = b""
+
+    def _same_fingerprint(self) -> bool:
+        """
+        Check that the first bytes of the followed file still match those seen at the last full scan.
+        :param self
+        :return: bool: True if the file still starts with the remembered fingerprint.
+        """
+        if not self.fingerprint:
+            return True
+        with open(self.path, "rb") as f:
+            return f.read(len(self.fingerprint)) == self.fingerprint
+
+    def _full_scan(self, size: int):
+        """
+        Scan the complete lines of the log file from the end for the last status entry.
+        :param self
+        :param size: The current size of the log file in bytes.
+        :type size: int
+        :return: None
+        """
+        self.offset = 0
+        self.partial = b""
+        self.fingerprint = b""
+        if size == 0:
+            return
+        with open(self.path, "rb") as f:
+            self.fingerprint = f.read(FINGERPRINT_SIZE)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as file:
+                end = file.rfind(b"\n") + 1
+                line_number = file.rfind(b"status", 0, end)
+                if line_number != -1:
+                    file.seek(line_number)
+                    self.status = parse_status_line(file.readline())
+        self.offset = end
+
+    def _read_delta(self, size: int):
+        """
+        Read the bytes appended since the last call and update the status from any complete lines.
+        :param self
+        :param size: The current size of the log file in bytes.
+        :type size: int
+        :return: None
+        """
+        with open(self.path, "rb") as f:
+            if self.offset == 0:
+                self.fingerprint = f.read(FINGERPRINT_SIZE)
+            f.seek(self.offset)
+            remaining = size - self.offset
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                self.offset += len(chunk)
+                data = self.partial + chunk
+                end = data.rfind(b"\n") + 1
+                line_number = data.rfind(b"status", 0, end)
+                if line_number != -1:
+                    self.status = parse_status_line(data[line_number:data.index(b"\n", line_number)])
+                self.partial = data[end:][-MAX_PARTIAL_LINE:]
+
+_TAILER = LogTailer()
+_INDEX = None
+
+def get_log_index() -> LogIndex:
+    """
+    Return the index of the configured Teams log files, starting over when the configured path changes.
+    :param None
+    :return: LogIndex: The log file index.
+    """
+    global _INDEX, _TAILER
+    pattern = config_handler.LOADED_CONFIG["teams_log_path"]
+    if _INDEX is None or _INDEX.pattern != pattern:
+        _INDEX = LogIndex(pattern)
+        _TAILER = LogTailer()
+    return _INDEX
+
+def invalidate_log_index():
+    """
+    Mark the Teams log file listing as outdated, e.g. when the log watcher sees a new log file.
+    :param None
+    :return: None
+    """
+    if _INDEX is not None:
+        _INDEX.invalidate()
 
 def extract_status() -> str:
     """
@@ -32,25 +267,29 @@ def extract_status() -> str:
     :param None
     :return: str: The extracted status ("Available", "Busy", "Away", or "Unknown").
     """
-    try:
-        logfile = glob.glob(config_handler.LOADED_CONFIG["teams_log_path"])[-1]
-    except IndexError:
-        config_handler.ERROR_STATUS = True
-        logging.error("No Teams log files found.")
-        messagebox.showerror("Teams Logs Not Found", "Error finding Teams log files. Please confirm the teams log path in the settings or open Microsoft Teams at least once to generate log files.")
-        return "Error: No Teams log files found."
-
-    new_status = "Unknown"
-    statuses = ["Available", "Away", "Busy", "Do not disturb"]
-    if os.path.getsize(logfile) != 0:
-        with open(logfile, "r", encoding="utf-8") as f:
-            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as file:
-                line_number = file.rfind('status'.encode("utf-8"))
-                if line_number != -1:
-                    file.seek(line_number)
-                    line = file.readline().decode("utf-8")
-                    if any(status in line for status in statuses):
-                        temp_status = line.split("status ")[1].strip()
-                        if temp_status != new_status:
-                            new_status = temp_status
-    return new_status
+    with span("extract_status") as result:
+        logfile = get_log_index().latest()
+        if logfile is None:
+            result.fail()
+            config_handler.ERROR_STATUS = True
+            logging.error("No Teams log files found.")
+            return "Error: No Teams log files found."
+        if _TAILER.path is not None and logfile != _TAILER.path:
+            _TAILER.rotate(logfile)
+        return _TAILER.read_status(logfile)
+
+def current_log_path():
+    """
+    Return the Teams log file the status was last read from.
+    :param None
+    :return: str or None: The file path of the followed log file, or None if no log file was read yet.
+    """
+    return _TAILER.path
+
+def status_changed_at():
+    """
+    Return when the log file was written with the latest status change, for end-to-end latency measurements.
+    :param None
+    :return: float or None: The modification time of the log file when the change was read, or None if unknown.
+    """
+    return _TAILER.changed_at
@@ -0,0 +1,100 @@
+"""
+This module filters status transitions between the Teams log and the light,
+so that quick flaps (e.g. Available -> Away -> Available while the screen locks briefly)
+do not each cause a write to the light. Only a status that has settled is passed on.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import logging
+import time
+from metrics import increment
+
+class TransitionFilter():
+    """
+    Debounce status transitions with a minimum dwell time and hysteresis.
+    A new status is only passed on once it has been seen continuously for the dwell time,
+    and the passed on status is held for at least the hysteresis time before it may change again.
+    Intermediate statuses seen within that window are collapsed and counted as suppressed.
+    :param self
+    :param dwell: Seconds a new status must be seen continuously before it is passed on.
+    :type dwell: float
+    :param hysteresis: Seconds a passed on status is held before another transition is allowed.
+    :type hysteresis: float
+    :param clock: Function returning the current time in seconds.
+    :type clock: callable
+    :return: None
+    """
+    def __init__(self, dwell: float = 3.0, hysteresis: float = 5.0, clock=time.monotonic):
+        self.dwell = dwell
+        self.hysteresis = hysteresis
+        self.clock = clock
+        self.settled = None
+        self.settled_at = None
+        self.candidate = None
+        self.candidate_since = None
+        self.suppressed = 0
+
+    def update(self, status: str) -> str:
+        """
+        Feed the latest raw status and return the settled status.
+        :param self
+        :param status: The status just read from the Teams log.
+        :type status: str
+        :return: str: The settled status to send to the light.
+        """
+        now = self.clock()
+        if self.settled is None:
+            self._settle(status, now)
+        elif status == self.settled:
+            if self.candidate is not None:
+                self._suppress(f"{self.candidate} reverted to {status}")
+                self.candidate = None
+        else:
+            if status != self.candidate:
+                if self.candidate is not None:
+                    self._suppress(f"{self.candidate} replaced by {status}")
+                self.candidate = status
+                self.candidate_since = now
+            if self.time_to_settle() == 0:
+                self._settle(status, now)
+        return self.settled
+
+    def time_to_settle(self):
+        """
+        Return how long until the pending status would be passed on, so that an update can be scheduled for it.
+        :param self
+        :return: float or None: Seconds until the pending status settles (0 if it may settle now), or None if nothing is pending.
+        """
+        if self.candidate is None:
+            return None
+        now = self.clock()
+        return max(self.candidate_since + self.dwell - now, self.settled_at + self.hysteresis - now, 0.0)
+
+    def _settle(self, status: str, now: float):
+        """
+        Pass on a status.
+        :param self
+        :param status: The status that settled.
+        :type status: str
+        :param now: The current time.
+        :type now: float
+        :return: None
+        """
+        if self.settled is not None:
+            logging.info("Status settled: %s -> %s", self.settled, status)
+        self.settled = status
+        self.settled_at = now
+        self.candidate = None
+        self.candidate_since = None
+
+    def _suppress(self, reason: str):
+        """
+        Count a transition that was collapsed without reaching the light.
+        :param self
+        :param reason: Description of the suppressed transition, for the log.
+        :type reason: str
+        :return: None
+        """
+        self.suppressed += 1
+        increment("suppressed_transitions")
+        logging.debug("Suppressed status transition (%s), %d suppressed so far.", reason, self.suppressed)
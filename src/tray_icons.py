@@ -0,0 +1,85 @@
+"""
+This module renders the system tray icons, tinted with the color configured for each status.
+Each icon is rendered once from the base icon and kept in memory keyed by status and color,
+so minimizing to the tray and status changes never touch the disk or decode a PNG again.
+Only imported by the GUI, as it needs Pillow.
+Author: Michelfrancis Bustillos
+"""
+# pylint: disable=line-too-long
+import logging
+import threading
+from PIL import Image, ImageOps
+import config_handler
+
+BASE_ICON = "icons/icon.png"
+ICON_SIZE = 64
+OFF_COLOR = (128, 128, 128)
+
+class IconCache():
+    """
+    Cache of tray icons rendered from the base icon and tinted with the status colors.
+    :param self
+    :param path: The path of the base icon.
+    :type path: str
+    :param size: The width and height of the rendered icons in pixels.
+    :type size: int
+    :return: None
+    """
+    def __init__(self, path: str = BASE_ICON, size: int = ICON_SIZE):
+        self.path = path
+        self.size = size
+        self.lock = threading.Lock()
+        self.base = None
+        self.images = {}
+        self.renders = 0
+
+    def get(self, status: str) -> Image.Image:
+        """
+        Return the icon for a status, rendering it on first use with the color currently configured for the status.
+        Statuses without a color (e.g. "Unknown", "Off" or errors) get a grey icon.
+        :param self
+        :param status: The status to show.
+        :type status: str
+        :return: Image.Image: The tinted icon.
+        """
+        color = config_handler.COLOR_TABLE.rgb.get(status, OFF_COLOR) if config_handler.COLOR_TABLE else OFF_COLOR
+        key = (status if color != OFF_COLOR else None, color)
+        with self.lock:
+            image = self.images.get(key)
+            if image is None:
+                image = self.images[key] = self._render(color)
+            return image
+
+    def config_changed(self, changed: set):
+        """
+        Drop the icons of colors that are no longer configured, when a status color changes.
+        :param self
+        :param changed: The changed configuration keys.
+        :type changed: set
+        :return: None
+        """
+        if not changed & {"busy_color", "away_color", "available_color"}:
+            return
+        colors = set(config_handler.COLOR_TABLE.rgb.values()) | {OFF_COLOR}
+        with self.lock:
+            self.images = {key: image for key, image in self.images.items() if key[1] in colors}
+
+    def _render(self, color: tuple) -> Image.Image:
+        """
+        Tint the base icon with a color, keeping its shading and transparency.
+        :param self
+        :param color: The (r, g, b) color.
+        :type color: tuple
+        :return: Image.Image: The tinted icon.
+        """
+        if self.base is None:
+            with Image.open(self.path) as image:
+                self.base = image.convert("RGBA").resize((self.size, self.size), Image.Resampling.LANCZOS)
+        tinted = ImageOps.colorize(self.base.convert("L"), black=(0, 0, 0), white=(255, 255, 255), mid=color).convert("RGBA")
+        tinted.putalpha(self.base.getchannel("A"))
+        self.renders += 1
+        logging.debug("Rendered tray icon for color %s", color)
+        return tinted
+
+ICONS = IconCache()
+config_handler.STORE.subscribe(ICONS.config_changed)